@@ -1,78 +1,683 @@
+import json
+import re
+import threading
+from collections import namedtuple
 from copy import copy
-from django.core.exceptions import FieldDoesNotExist
-from django.db import models
-from django_filters.rest_framework import DjangoFilterBackend
+from django import forms
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models, router
+from django.db.models import F, Lookup, Q, UniqueConstraint
+from django_filters.constants import EMPTY_VALUES
+from django_filters.filters import Filter
+from django_filters.rest_framework import DjangoFilterBackend, FilterSet
+from drf_tweaks.search import FullTextSearchFilter, register_search_index
+from functools import reduce
+from operator import or_
 from rest_framework import filters
+from rest_framework.serializers import Serializer
+from rest_framework.settings import import_from_string
 
+# fields: names of indexed fields, leading first, with "-" prefix for descending ones
+# type: "btree", "hash", "gin", "gist", "brin", ... and "trigram" (trigram opclasses) or "fts" (full text search)
+# function: lowercase name of the function for functional indexes (e.g. "lower"), None otherwise
+AutofilterIndex = namedtuple("AutofilterIndex", ["fields", "type", "function"])
 
-def autofilter(extra_ordering=None, extra_filter=None, exclude_fields=None):
-    def wrapped(cls):
-        # get indexed fields
-        serializer_class = cls().get_serializer_class()
-        model_cls = serializer_class.Meta.model
-        fields = set([])
-        for serializer_field in serializer_class()._readable_fields:
-            name = serializer_field.field_name
+
+def _get_index_type(suffix, opclasses=(), definition=""):
+    if any("trgm_ops" in opclass for opclass in opclasses) or "trgm_ops" in definition:
+        return "trigram"
+    if "to_tsvector" in definition:
+        return "fts"
+    return "btree" if suffix in (None, "idx", "btree") else suffix
+
+
+def _get_expression_fields(expression):
+    return tuple(node.name for node in expression.flatten() if isinstance(node, F))
+
+
+def _get_functional_index(index, expression):
+    # unwrap ordering (e.g. Lower("name").desc()) to the function
+    while isinstance(expression, models.expressions.OrderBy) or type(expression).__name__ == "IndexExpression":
+        expression = expression.get_source_expressions()[0]
+    function = type(expression).__name__.lower()
+    index_type = "fts" if function == "searchvector" else _get_index_type(index.suffix, index.opclasses)
+    return AutofilterIndex(_get_expression_fields(expression), index_type, function)
+
+
+def _introspect_indexes(model, using=None):
+    """Indexes of model's table in the live database schema"""
+    connection = connections[using or router.db_for_read(model)]
+    columns = {field.column: field.name for field in model._meta.concrete_fields}
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+    indexes = []
+    for constraint in constraints.values():
+        if not (constraint["index"] or constraint["unique"] or constraint["primary_key"]) or constraint.get("check"):
+            continue
+
+        definition = constraint.get("definition") or ""
+        index_type = _get_index_type(constraint.get("type"), definition=definition)
+        names = [columns.get(column) for column in constraint["columns"]]
+        if names and None not in names:
+            orders = constraint.get("orders") or []
+            fields = tuple(
+                ("-" if position < len(orders) and orders[position] == "DESC" else "") + name
+                for position, name in enumerate(names)
+            )
+            indexes.append(AutofilterIndex(fields, index_type, None))
+        elif index_type in ("fts", "trigram"):
+            # expression based indexes - fields are found in the definition
+            fields = tuple(name for column, name in columns.items() if re.search(rf"\b{column}\b", definition))
+            if fields:
+                indexes.append(AutofilterIndex(fields, index_type, "searchvector" if index_type == "fts" else None))
+    return indexes
+
+
+def get_model_indexes(model, using=None, introspect=False):
+    """
+    Indexes of the model: primary key, db_index & unique fields, index_together, unique_together, Meta.indexes
+    (including functional ones) and unique constraints. Partial indexes (with condition) are skipped, as they cannot
+    serve all the queries. With introspect=True indexes present in the live database schema are added.
+    """
+    indexes = []
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.db_index or field.unique:
+            indexes.append(AutofilterIndex((field.name, ), "btree", None))
+
+    for fields in list(model._meta.index_together) + list(model._meta.unique_together):
+        indexes.append(AutofilterIndex(tuple(fields), "btree", None))
+
+    for index in model._meta.indexes:
+        if getattr(index, "condition", None) is not None:
+            continue
+        expressions = getattr(index, "expressions", ())
+        if expressions:
+            indexes.append(_get_functional_index(index, expressions[0]))
+        else:
+            indexes.append(AutofilterIndex(tuple(index.fields), _get_index_type(index.suffix, index.opclasses), None))
+
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.condition is None and constraint.fields:
+            indexes.append(AutofilterIndex(tuple(constraint.fields), "btree", None))
+
+    if introspect:
+        indexes += _introspect_indexes(model, using)
+
+    # remove duplicates, keeping the order
+    return list(dict.fromkeys(indexes))
+
+
+def _get_field_indexes(indexes, name):
+    """Indexes which can serve filtering by the field: with the field leading, or functional ones on the field"""
+    return [
+        index for index in indexes
+        if index.fields and (index.fields[0].lstrip("-") == name or (index.function and name in index.fields))
+    ]
+
+
+def _is_leading_field(indexes, name, index_type=None):
+    return any(
+        index.function is None and index.fields[0].lstrip("-") == name and index_type in (None, index.type)
+        for index in indexes
+    )
+
+
+def get_related_index_paths(model, field_names, depth, introspect=False, prefix=""):
+    """
+    (path, field, indexes) of indexed fields of related models, reachable from given fields of the model by forward
+    foreign keys & one-to-one relations, up to depth hops. Every hop must be indexed on both sides (the relation's
+    column & the referenced one) and the target field must be the leading field of an index, so the joins can be
+    done with index lookups.
+    """
+    indexes = get_model_indexes(model, introspect=introspect)
+    paths = []
+    for name in field_names:
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if not (field.many_to_one or field.one_to_one) or not field.concrete or not _is_leading_field(indexes, name):
+            continue
+
+        related_model = field.related_model
+        related_indexes = get_model_indexes(related_model, introspect=introspect)
+        if not _is_leading_field(related_indexes, field.target_field.name):
+            continue
+
+        for related_field in related_model._meta.concrete_fields:
+            # filtering by the referenced field is the same as filtering by the relation itself
+            if related_field.name == field.target_field.name:
+                continue
+            if _is_leading_field(related_indexes, related_field.name):
+                paths.append((
+                    f"{prefix}{name}__{related_field.name}", related_field,
+                    _get_field_indexes(related_indexes, related_field.name)
+                ))
+
+        if depth > 1:
+            paths += get_related_index_paths(
+                related_model, [related_field.name for related_field in related_model._meta.concrete_fields],
+                depth - 1, introspect, prefix=f"{prefix}{name}__"
+            )
+    return paths
+
+
+class CompactInField(forms.CharField):
+    """
+    Comma separated values and "start..end" ranges (e.g. "1..100,205,300..310") of the model field - cleaned to
+    (values, ranges) with model field's to_python, so related objects are not fetched one by one
+    """
+    default_error_messages = {
+        "invalid_value": "Invalid value: %(value)s.",
+        "too_many_values": "Ensure this value has at most %(max_values)s items (it has %(count)s).",
+    }
+
+    def __init__(self, *args, model_field=None, max_values=None, **kwargs):
+        self.model_field = model_field
+        self.max_values = max_values
+        super().__init__(*args, **kwargs)
+
+    def to_python_value(self, value):
+        return self.model_field.to_python(value) if self.model_field is not None else value
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return None
+
+        tokens = [token.strip() for token in value.split(",") if token.strip()]
+        if self.max_values is not None and len(tokens) > self.max_values:
+            raise forms.ValidationError(
+                self.error_messages["too_many_values"], code="too_many_values",
+                params={"max_values": self.max_values, "count": len(tokens)},
+            )
+
+        # texts may contain "..", so ranges are not supported for them
+        allow_ranges = not isinstance(self.model_field, (models.CharField, models.TextField))
+        values = []
+        ranges = []
+        for token in tokens:
             try:
-                if name == "id" or getattr(model_cls._meta.get_field(name), "db_index", False) \
-                        or getattr(model_cls._meta.get_field(name), "unique", False):
-                    if exclude_fields is None or name not in exclude_fields:
-                        fields.add(name)
-            except FieldDoesNotExist:
+                if allow_ranges and ".." in token:
+                    start, end = token.split("..", 1)
+                    ranges.append((self.to_python_value(start.strip()), self.to_python_value(end.strip())))
+                else:
+                    values.append(self.to_python_value(token))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise forms.ValidationError(
+                    self.error_messages["invalid_value"], code="invalid_value", params={"value": token}
+                )
+        return values, ranges
+
+
+class ValuesInLookup(Lookup):
+    """
+    IN with the whole list of values passed as a single parameter - "= ANY(%s)" (array) on PostgreSQL and
+    "IN (SELECT value FROM json_each(%s))" on SQLite - so thousands of values do not mean thousands of bound parameters
+    to parse & plan (and no backend's limit of parameters applies). Plain IN list on other databases.
+    """
+    lookup_name = "drf_tweaks_values_in"
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        field = self.lhs.output_field
+        values = [field.get_db_prep_value(value, connection, prepared=False) for value in self.rhs]
+        if connection.vendor == "postgresql":
+            return f"{lhs} = ANY(%s)", list(lhs_params) + [values]
+        if connection.vendor == "sqlite":
+            return f"{lhs} IN (SELECT value FROM json_each(%s))", list(lhs_params) + [
+                json.dumps(values, cls=DjangoJSONEncoder)
+            ]
+        return f"{lhs} IN ({', '.join(['%s'] * len(values))})", list(lhs_params) + values
+
+
+models.Field.register_lookup(ValuesInLookup)
+
+
+class CompactInFilter(Filter):
+    """
+    __in filter accepting ranges besides single values (see CompactInField). Values are de-duplicated; above the
+    threshold they are sorted, consecutive integers are merged into ranges (BETWEEN), and the rest is sent as a single
+    parameter (see ValuesInLookup) - so huge lists of ids do not produce a huge IN list.
+    """
+    field_class = CompactInField
+    threshold = 100
+    max_values = None
+
+    def __init__(self, *args, threshold=None, **kwargs):
+        kwargs.setdefault("lookup_expr", "in")
+        kwargs.setdefault("max_values", self.max_values)
+        super().__init__(*args, **kwargs)
+        if threshold is not None:
+            self.threshold = threshold
+
+    def get_query(self, values, ranges):
+        name = f"{self.field_name}__{self.lookup_expr}"
+        range_name = f"{self.field_name}__range"
+        values = list(dict.fromkeys(value for value in values if value is not None))
+        ranges = list(dict.fromkeys(ranges))
+        if len(values) > self.threshold:
+            name = f"{self.field_name}__{ValuesInLookup.lookup_name}"
+            try:
+                values.sort()
+            except TypeError:
                 pass
+            if all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+                singles = []
+                run = []
+                for value in values + [None]:
+                    if run and (value is None or value != run[-1] + 1):
+                        if len(run) > 2:
+                            ranges.append((run[0], run[-1]))
+                        else:
+                            singles += run
+                        run = []
+                    if value is not None:
+                        run.append(value)
+                values = singles
+
+        queries = [Q(**{range_name: (start, end)}) for start, end in ranges]
+        if values:
+            queries.append(Q(**{name: values}))
+        return reduce(or_, queries) if queries else Q(pk__in=[])
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        if self.distinct:
+            qs = qs.distinct()
+        query = self.get_query(*value)
+        return self.get_method(qs)(query)
+
+
+class CompactInFilterSetMixin(object):
+    """Uses CompactInFilter for __in lookups"""
+
+    @classmethod
+    def filter_for_lookup(cls, field, lookup_type):
+        if lookup_type == "in":
+            return CompactInFilter, {"model_field": field}
+        return super().filter_for_lookup(field, lookup_type)
+
 
-        # add ordering & filtering backends
-        if getattr(cls, "filter_backends", None):
-            cls.filter_backends = list(set(cls.filter_backends) | {DjangoFilterBackend, filters.OrderingFilter})
+class CompactInFilterSet(CompactInFilterSetMixin, FilterSet):
+    pass
+
+
+class CompactInFilterBackend(DjangoFilterBackend):
+    filterset_base = CompactInFilterSet
+
+
+def _get_nested_readable_paths(serializer, depth, prefix=""):
+    """Paths (e.g. "author__email") of readable fields of nested (not many) serializers, up to depth levels"""
+    paths = set()
+    for serializer_field in serializer._readable_fields:
+        if not isinstance(serializer_field, Serializer) or not re.match(r"^\w+$", serializer_field.source):
+            continue
+        nested_prefix = f"{prefix}{serializer_field.source}__"
+        for nested_field in serializer_field._readable_fields:
+            if re.match(r"^\w+$", nested_field.source):
+                paths.add(f"{nested_prefix}{nested_field.source}")
+        if depth > 1:
+            paths |= _get_nested_readable_paths(serializer_field, depth - 1, nested_prefix)
+    return paths
+
+
+def _get_ordering_sequences(indexes, fields):
+    """Prefixes of b-tree indexes containing only given fields"""
+    sequences = []
+    for index in indexes:
+        if index.type != "btree" or index.function is not None:
+            continue
+        sequence = []
+        for index_field in index.fields:
+            if index_field.lstrip("-") not in fields:
+                break
+            sequence.append(index_field)
+        if sequence and tuple(sequence) not in sequences:
+            sequences.append(tuple(sequence))
+    return sequences
+
+
+class IndexOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter accepting only orderings that can be served by an index - view's ordering_sequences (set by
+    autofilter with index_ordering=True): the requested fields must be a prefix of one of the sequences, with the same
+    directions as in the index or all of them reversed. Otherwise the longest compatible prefix is used.
+    """
+
+    def is_index_compatible(self, ordering, sequences):
+        for sequence in sequences:
+            if len(ordering) > len(sequence):
+                continue
+            if [term.lstrip("-") for term in ordering] != [field.lstrip("-") for field in sequence[:len(ordering)]]:
+                continue
+            same_directions = [term.startswith("-") == field.startswith("-") for term, field in zip(ordering, sequence)]
+            if all(same_directions) or not any(same_directions):
+                return True
+        return False
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        ordering = super().remove_invalid_fields(queryset, fields, view, request)
+        sequences = getattr(view, "ordering_sequences", None)
+        if sequences is None:
+            return ordering
+
+        for length in range(len(ordering), 0, -1):
+            if self.is_index_compatible(ordering[:length], sequences):
+                return ordering[:length]
+        return []
+
+
+class LookupPolicy(object):
+    """
+    Lookups generated for filter fields - by default all the comparisons, plus icontains & istartswith for texts,
+    regardless of the indexes. Subclass it and override get_lookups to change the lookups.
+    """
+    comparison_lookups = ["exact", "gt", "gte", "lt", "lte", "in", "isnull"]
+    text_lookups = ["icontains", "istartswith"]
+
+    def is_text(self, field):
+        return isinstance(field, (models.CharField, models.TextField))
+
+    def get_lookups(self, field, indexes, vendor):
+        """
+        field: model field, indexes: AutofilterIndex list of field's indexes (leading or functional), vendor:
+        connection.vendor of the model's database
+        """
+        lookups = list(self.comparison_lookups)
+        if self.is_text(field):
+            lookups += self.text_lookups
+        return lookups
+
+
+class IndexLookupPolicy(LookupPolicy):
+    """
+    Only lookups which can be served by field's indexes:
+    - exact & in for all the indexes, isnull for b-tree indexes,
+    - gt, gte, lt & lte for b-tree (and brin) indexes on orderable types (not booleans, relations, JSON etc.),
+    - startswith for b-tree indexes on texts, where LIKE 'prefix%' can use them (PostgreSQL - Django creates
+      pattern_ops indexes for db_index text fields, MySQL; not SQLite, as Django's LIKE ... ESCAPE cannot use index),
+    - icontains, istartswith & contains for trigram indexes (gin_trgm_ops / gist_trgm_ops),
+    - iexact for functional indexes on Upper(field) (PostgreSQL).
+    Full text search indexes cannot serve LIKE queries. Explicitly added (not indexed) fields get default lookups.
+    """
+    prefix_lookup_vendors = ("postgresql", "mysql")
+
+    def is_orderable(self, field):
+        if field.is_relation or isinstance(field, (models.BooleanField, models.BinaryField)):
+            return False
+        return field.get_internal_type() != "JSONField"
+
+    def get_lookups(self, field, indexes, vendor):
+        if not indexes:
+            return super().get_lookups(field, indexes, vendor)
+
+        lookups = []
+
+        def add(*new_lookups):
+            lookups.extend(lookup for lookup in new_lookups if lookup not in lookups)
+
+        for index in indexes:
+            if index.function == "upper" and vendor == "postgresql":
+                add("iexact")
+            elif index.function is not None:
+                continue
+            elif index.type == "btree":
+                add("exact", "in", "isnull")
+                if self.is_orderable(field):
+                    add("gt", "gte", "lt", "lte")
+                if self.is_text(field) and vendor in self.prefix_lookup_vendors:
+                    add("startswith")
+            elif index.type == "brin":
+                add("exact", "in")
+                if self.is_orderable(field):
+                    add("gt", "gte", "lt", "lte")
+            elif index.type == "hash":
+                add("exact", "in")
+            elif index.type == "trigram":
+                add("icontains", "istartswith", "contains")
+        return lookups
+
+
+def _get_default_lookup_policy():
+    if hasattr(settings, "AUTOFILTER_LOOKUP_POLICY"):
+        return import_from_string(settings.AUTOFILTER_LOOKUP_POLICY, "AUTOFILTER_LOOKUP_POLICY")()
+    return LookupPolicy()
+
+
+def _autofilter_view(cls, originals, extra_ordering=None, extra_filter=None, exclude_fields=None, introspect_db=False,
+                     index_ordering=False, lookup_policy=None, related_depth=0, related_fields=None, compact_in=False,
+                     search=None):
+    """
+    Filter backends, ordering & filter fields of the view (returned as a dict of class attributes to set) - originals
+    are view's attributes before the autofilter
+    """
+    attributes = {}
+    # get indexed fields
+    serializer_class = cls().get_serializer_class()
+    model_cls = serializer_class.Meta.model
+    indexes = get_model_indexes(model_cls, introspect=introspect_db)
+    leading_fields = {index.fields[0].lstrip("-") for index in indexes if index.function is None}
+    # hash, gin etc. indexes cannot serve ordering
+    orderable_fields = {
+        index.fields[0].lstrip("-") for index in indexes if index.function is None and index.type == "btree"
+    }
+    readable_fields = set([])
+    fields = set([])
+    for serializer_field in serializer_class()._readable_fields:
+        name = serializer_field.field_name
+        try:
+            model_cls._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        if exclude_fields is None or name not in exclude_fields:
+            readable_fields.add(name)
+            if name == "id" or name in leading_fields:
+                fields.add(name)
+
+    # add ordering & filtering backends
+    ordering_backend = IndexOrderingFilter if index_ordering else filters.OrderingFilter
+    filter_backend = CompactInFilterBackend if compact_in else DjangoFilterBackend
+    if originals.get("filter_backends"):
+        filter_backends = set(originals["filter_backends"]) - {filters.OrderingFilter, DjangoFilterBackend}
+        attributes["filter_backends"] = list(filter_backends | {filter_backend, ordering_backend})
+    else:
+        attributes["filter_backends"] = [filter_backend, ordering_backend]
+    if search and FullTextSearchFilter not in attributes["filter_backends"]:
+        attributes["filter_backends"].append(FullTextSearchFilter)
+
+    # indexed fields of related models - only those visible to the client (or explicitly allowed)
+    related_paths = []
+    if related_depth:
+        if related_fields is not None:
+            allowed_paths = set(related_fields)
         else:
-            cls.filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-
-        # update ordering
-        new_ordering = copy(fields)
-        if extra_ordering:
-            new_ordering |= set(extra_ordering)
-        if getattr(cls, "ordering_fields", None):
-            new_ordering |= set(cls.ordering_fields)
-        cls.ordering_fields = list(new_ordering)
-
-        # update filter fields
-        new_filters = {}
-        new_filter_keys = copy(fields)
-        if extra_filter:
-            new_filter_keys |= set(extra_filter)
-
-        update_class = False
-        explicit_filters = None
-        if hasattr(cls, "filter_class"):
-            update_class = True
-            if hasattr(cls.filter_class, "Meta"):
-                explicit_filters = getattr(cls.filter_class.Meta, "fields", None)
+            allowed_paths = _get_nested_readable_paths(serializer_class(), related_depth)
+        related_paths = [
+            (path, field, field_indexes)
+            for path, field, field_indexes in get_related_index_paths(
+                model_cls, sorted(readable_fields), related_depth, introspect_db
+            )
+            if path in allowed_paths and (exclude_fields is None or path not in exclude_fields)
+        ]
+
+    # update ordering
+    new_ordering = fields & orderable_fields
+    new_ordering |= {
+        path for path, field, field_indexes in related_paths if _is_leading_field(field_indexes, field.name, "btree")
+    }
+    explicit_ordering = set(extra_ordering or []) | set(originals.get("ordering_fields") or [])
+    new_ordering |= explicit_ordering
+    if index_ordering:
+        # composite indexes allow ordering by their prefixes
+        sequences = _get_ordering_sequences(indexes, readable_fields)
+        for sequence in sequences:
+            new_ordering |= {field.lstrip("-") for field in sequence}
+        # explicit, primary key & related fields can be used on their own
+        single_fields = [
+            field for field in sorted(new_ordering) if field in explicit_ordering or field == "id" or "__" in field
+        ]
+        attributes["ordering_sequences"] = sequences + [
+            (field, ) for field in single_fields if (field, ) not in sequences
+        ]
+    attributes["ordering_fields"] = list(new_ordering)
+
+    # update filter fields
+    new_filters = {}
+    new_filter_keys = copy(fields)
+    if extra_filter:
+        new_filter_keys |= set(extra_filter)
+
+    update_class = False
+    explicit_filters = None
+    if "filter_class" in originals:
+        update_class = True
+        if hasattr(originals["filter_class"], "Meta"):
+            explicit_filters = getattr(originals["filter_class"].Meta, "fields", None)
+    else:
+        explicit_filters = originals.get("filter_fields")
+
+    if explicit_filters:
+        if isinstance(explicit_filters, dict):
+            new_filters = explicit_filters
         else:
-            explicit_filters = getattr(cls, "filter_fields", None)
+            for key in explicit_filters:
+                new_filters[key] = ["exact"]
+
+    policy = lookup_policy or getattr(cls, "autofilter_lookup_policy", None) or _get_default_lookup_policy()
+    vendor = connections[router.db_for_read(model_cls)].vendor
+    for key in new_filter_keys:
+        try:
+            field = model_cls._meta.get_field(key)
+        except FieldDoesNotExist:
+            continue
+        lookups = policy.get_lookups(field, _get_field_indexes(indexes, key), vendor)
+        if lookups:
+            new_filters[key] = lookups
+    for path, field, field_indexes in related_paths:
+        lookups = policy.get_lookups(field, field_indexes, vendor)
+        if lookups:
+            new_filters[path] = lookups
+
+    if update_class:
+        bases = (originals["filter_class"], )
+        if compact_in and not issubclass(originals["filter_class"], CompactInFilterSetMixin):
+            bases = (CompactInFilterSetMixin, ) + bases
+
+        class new_filter_class(*bases):
+            class Meta(originals["filter_class"].Meta):
+                fields = new_filters
+        attributes["filter_class"] = new_filter_class
+    else:
+        attributes["filter_fields"] = new_filters
+    return attributes
+
+
+# attributes set by the autofilter - ordering_sequences only with index_ordering, filter_class if view has one
+_AUTOFILTER_ATTRIBUTES = ("filter_backends", "ordering_fields", "ordering_sequences", "filter_fields", "filter_class")
+_pending_autofilters = []
+
 
-        if explicit_filters:
-            if isinstance(explicit_filters, dict):
-                new_filters = explicit_filters
-            else:
-                for key in explicit_filters:
-                    new_filters[key] = ["exact"]
+class _LazyAutofilter(object):
+    """Autofilter of the view computed on first access to any of the attributes it sets"""
 
-        for key in new_filter_keys:
+    def __init__(self, cls, options):
+        self.cls = cls
+        self.options = options
+        self.lock = threading.RLock()
+        self.resolved = False
+        self.resolving = False
+        self.originals = {name: getattr(cls, name) for name in _AUTOFILTER_ATTRIBUTES if hasattr(cls, name)}
+        self.names = [
+            name for name in _AUTOFILTER_ATTRIBUTES
+            if name not in ("ordering_sequences", "filter_class") or (
+                name == "ordering_sequences" and options["index_ordering"] or name in self.originals
+            )
+        ]
+        for name in self.names:
+            setattr(cls, name, _LazyAutofilterAttribute(self, name))
+
+    def resolve(self):
+        with self.lock:
+            if self.resolved or self.resolving:
+                return
+            # computed with the lazy attributes in place, so other threads wait for the lock instead of reading
+            # inherited values
+            self.resolving = True
             try:
-                field = model_cls._meta.get_field(key)
-                new_filters[key] = ["exact", "gt", "gte", "lt", "lte", "in", "isnull"]
-                if isinstance(field, models.CharField) or isinstance(field, models.TextField):
-                    new_filters[key] += ["icontains", "istartswith"]
-            except FieldDoesNotExist:
-                pass
+                attributes = _autofilter_view(self.cls, self.originals, **self.options)
+            finally:
+                self.resolving = False
+            # lazy attributes are replaced with the computed ones, the rest is restored
+            for name, value in attributes.items():
+                setattr(self.cls, name, value)
+            for name in self.names:
+                if name in attributes:
+                    continue
+                if name in self.originals:
+                    setattr(self.cls, name, self.originals[name])
+                else:
+                    delattr(self.cls, name)
+            self.resolved = True
+            if self in _pending_autofilters:
+                _pending_autofilters.remove(self)
+
+
+class _LazyAutofilterAttribute(object):
+    def __init__(self, lazy_autofilter, name):
+        self.lazy_autofilter = lazy_autofilter
+        self.name = name
+
+    def __get__(self, instance, owner):
+        lazy_autofilter = self.lazy_autofilter
+        lazy_autofilter.resolve()
+        if not lazy_autofilter.resolved:
+            # read while the autofilter is being computed (in the same thread) - attribute as before the decorator
+            if self.name in lazy_autofilter.originals:
+                return lazy_autofilter.originals[self.name]
+            raise AttributeError(self.name)
+        return getattr(instance if instance is not None else owner, self.name)
 
-        if update_class:
-            class new_filter_class(cls.filter_class):
-                class Meta(cls.filter_class.Meta):
-                    fields = new_filters
-            cls.filter_class = new_filter_class
-        else:
-            cls.filter_fields = new_filters
 
+def resolve_autofilters():
+    """Computes all the lazy autofilters (e.g. to do it at startup, once the urlconf is imported)"""
+    for lazy_autofilter in list(_pending_autofilters):
+        lazy_autofilter.resolve()
+
+
+def _get_view_model(cls):
+    if getattr(cls, "queryset", None) is not None:
+        return cls.queryset.model
+    if getattr(cls, "serializer_class", None) is not None:
+        return cls.serializer_class.Meta.model
+    return cls().get_serializer_class().Meta.model
+
+
+def autofilter(extra_ordering=None, extra_filter=None, exclude_fields=None, introspect_db=False, index_ordering=False,
+               lookup_policy=None, lazy=True, related_depth=0, related_fields=None, compact_in=False, search=None,
+               search_config="simple"):
+    def wrapped(cls):
+        options = {
+            "extra_ordering": extra_ordering, "extra_filter": extra_filter, "exclude_fields": exclude_fields,
+            "introspect_db": introspect_db, "index_ordering": index_ordering, "lookup_policy": lookup_policy,
+            "related_depth": related_depth, "related_fields": related_fields, "compact_in": compact_in,
+            "search": search,
+        }
+        # marker for the query plans check
+        cls._autofiltered = True
+        # search index is registered immediately, so the signals keep it in sync from the start
+        if search:
+            cls.search_index = register_search_index(_get_view_model(cls), search, search_config)
+        if lazy:
+            _pending_autofilters.append(_LazyAutofilter(cls, options))
+        else:
+            originals = {name: getattr(cls, name) for name in _AUTOFILTER_ATTRIBUTES if hasattr(cls, name)}
+            for name, value in _autofilter_view(cls, originals, **options).items():
+                setattr(cls, name, value)
         return cls
     return wrapped
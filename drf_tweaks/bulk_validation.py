@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+""" Batched validation of many serializers at once - used by BulkEditAPIMixin
+
+    Each serializer validated separately runs its own query for each UniqueValidator, UniqueTogetherValidator and
+    PrimaryKeyRelatedField - so N items cost N queries times the number of validators. BulkValidator resolves them
+    with one query per validator/field for all the serializers:
+    - primary keys of related objects are fetched before the validation,
+    - unique validators only record the values during the validation, and all the recorded values are checked
+      afterwards (including duplicates inside the validated data).
+
+    usage:
+        bulk_validator = BulkValidator(serializers)
+        for serializer in serializers:
+            serializer.is_valid()
+        bulk_validator.validate()
+        # serializer.errors contain errors from all validators
+"""
+from collections import defaultdict
+from django.core.exceptions import ObjectDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from functools import reduce
+from operator import or_
+from rest_framework.fields import empty
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+
+
+def _normalize(value):
+    return getattr(value, "pk", value)
+
+
+def _get_own_pks(serializer):
+    return {serializer.instance.pk} if serializer.instance is not None else set()
+
+
+class PrefetchedPrimaryKeyRelatedField(object):
+    """Replacement of PrimaryKeyRelatedField.to_internal_value, using objects fetched for all serializers"""
+
+    def __init__(self, field, objects):
+        self.field = field
+        self.objects = objects
+
+    def __call__(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = self.field.get_queryset().model._meta.pk.to_python(data)
+            return self.objects[pk]
+        except (KeyError, ObjectDoesNotExist):
+            self.field.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.field.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class RecordingUniqueValidator(object):
+    """Replacement of UniqueValidator, recording values to be checked later by BulkValidator"""
+    requires_context = True
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.records = []
+
+    def __call__(self, value, serializer_field):
+        self.records.append((serializer_field.parent, serializer_field.field_name, value))
+
+    def validate(self):
+        """Returns list of (serializer, field_name, message) tuples for values that are not unique"""
+        if not self.records:
+            return []
+
+        values = set()
+        for serializer, serializer_field_name, value in self.records:
+            field_name = serializer.fields[serializer_field_name].source_attrs[-1]
+            values.add(_normalize(value))
+
+        existing = defaultdict(set)
+        queryset = self.validator.queryset.filter(**{"%s__in" % field_name: values})
+        for value, pk in queryset.values_list(field_name, "pk"):
+            existing[value].add(pk)
+
+        errors = []
+        seen = set()
+        for serializer, serializer_field_name, value in self.records:
+            value = _normalize(value)
+            conflicting_pks = existing[value] - _get_own_pks(serializer)
+            if conflicting_pks or value in seen:
+                errors.append((serializer, serializer_field_name, self.validator.message))
+            seen.add(value)
+        return errors
+
+
+class RecordingUniqueTogetherValidator(object):
+    """Replacement of UniqueTogetherValidator, recording values to be checked later by BulkValidator"""
+    requires_context = True
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.records = []
+
+    def __call__(self, attrs, serializer):
+        self.validator.enforce_required_fields(attrs, serializer)
+        values = []
+        for field_name in self.validator.fields:
+            source = serializer.fields[field_name].source
+            if source in attrs:
+                values.append(attrs[source])
+            else:
+                values.append(getattr(serializer.instance, source))
+
+        # validation is ignored if any field is None
+        if None not in values:
+            sources = tuple(serializer.fields[field_name].source for field_name in self.validator.fields)
+            self.records.append((serializer, sources, tuple(_normalize(value) for value in values)))
+
+    def validate(self):
+        """Returns list of (serializer, field_name, message) tuples for sets of values that are not unique"""
+        if not self.records:
+            return []
+
+        sources = self.records[0][1]
+        existing = defaultdict(set)
+        query = reduce(or_, [Q(**dict(zip(sources, values))) for _, _, values in self.records])
+        for row in self.validator.queryset.filter(query).values_list(*(sources + ("pk", ))):
+            existing[row[:-1]].add(row[-1])
+
+        message = self.validator.message.format(field_names=", ".join(self.validator.fields))
+        errors = []
+        seen = set()
+        for serializer, _, values in self.records:
+            conflicting_pks = existing[values] - _get_own_pks(serializer)
+            if conflicting_pks or values in seen:
+                errors.append((serializer, None, message))
+            seen.add(values)
+        return errors
+
+
+class BulkValidator(object):
+    """
+    prefetched_objects - related objects already fetched (see get_prefetched_objects) as {field_name: {pk: object}},
+    so no queries are run - e.g. for a copy of a serializer validated in another process
+    """
+
+    def __init__(self, serializers, prefetched_objects=None):
+        self.serializers = serializers
+        self.recording_validators = {}
+        self.prefetched_objects = {}
+        self.prefetch_related_objects(prefetched_objects)
+        for serializer in serializers:
+            self.replace_unique_validators(serializer)
+
+    def get_recording_validator(self, key, validator, recording_validator_class):
+        if key not in self.recording_validators:
+            self.recording_validators[key] = recording_validator_class(validator)
+        return self.recording_validators[key]
+
+    def replace_unique_validators(self, serializer):
+        for field_name, field in serializer.fields.items():
+            if field.read_only:
+                continue
+            field.validators = [
+                self.get_recording_validator(("field", field_name), validator, RecordingUniqueValidator)
+                if isinstance(validator, UniqueValidator) and validator.lookup == "exact" else validator
+                for validator in field.validators
+            ]
+
+        serializer.validators = [
+            self.get_recording_validator(("serializer", tuple(validator.fields)), validator,
+                                         RecordingUniqueTogetherValidator)
+            if isinstance(validator, UniqueTogetherValidator) else validator
+            for validator in serializer.validators
+        ]
+
+    def get_primary_key_fields(self, serializer):
+        """Returns (field_name, PrimaryKeyRelatedField) pairs - also for children of ManyRelatedFields"""
+        for field_name, field in serializer.fields.items():
+            if field.read_only:
+                continue
+            if isinstance(field, ManyRelatedField):
+                field = field.child_relation
+            if isinstance(field, PrimaryKeyRelatedField) and field.pk_field is None:
+                yield field_name, field
+
+    def get_related_pks(self, serializer, field_name, field):
+        value = serializer.fields[field_name].get_value(serializer.initial_data)
+        if value is empty or value is None:
+            return set()
+        pks = set()
+        for pk in (value if isinstance(value, (list, tuple)) else [value]):
+            try:
+                if not isinstance(pk, bool):
+                    pks.add(field.get_queryset().model._meta.pk.to_python(pk))
+            except (TypeError, ValueError, DjangoValidationError):
+                pass  # incorrect values will be reported during the validation
+        return pks
+
+    def prefetch_related_objects(self, prefetched_objects=None):
+        fields = defaultdict(list)
+        values = defaultdict(set)
+        for serializer in self.serializers:
+            for field_name, field in self.get_primary_key_fields(serializer):
+                fields[field_name].append(field)
+                values[field_name] |= self.get_related_pks(serializer, field_name, field)
+
+        for field_name, field_instances in fields.items():
+            if prefetched_objects is not None:
+                objects = prefetched_objects.get(field_name, {})
+            elif values[field_name]:
+                objects = field_instances[0].get_queryset().in_bulk(values[field_name])
+            else:
+                objects = {}
+            self.prefetched_objects[field_name] = objects
+            for field in field_instances:
+                field.to_internal_value = PrefetchedPrimaryKeyRelatedField(field, objects)
+
+    def get_prefetched_objects(self, serializer):
+        """Related objects fetched for the values of the serializer - {field_name: {pk: object}}"""
+        return {
+            field_name: {
+                pk: self.prefetched_objects[field_name][pk]
+                for pk in self.get_related_pks(serializer, field_name, field)
+                if pk in self.prefetched_objects[field_name]
+            }
+            for field_name, field in self.get_primary_key_fields(serializer)
+        }
+
+    def get_records(self, serializer):
+        """Values recorded by unique validators for the serializer - [(key, field_name or sources, value)]"""
+        return [
+            (key, ) + record[1:]
+            for key, recording_validator in self.recording_validators.items()
+            for record in recording_validator.records if record[0] is serializer
+        ]
+
+    def add_records(self, serializer, records):
+        """Adds values recorded for a copy of the serializer (see get_records) - e.g. validated in another process"""
+        for key, field_name, value in records:
+            if key in self.recording_validators:
+                self.recording_validators[key].records.append((serializer, field_name, value))
+
+    def validate(self):
+        """Checks the values recorded by unique validators and adds errors to the serializers"""
+        # serializers may be validated in parallel - records are checked in the order of serializers
+        positions = {id(serializer): position for position, serializer in enumerate(self.serializers)}
+        for recording_validator in self.recording_validators.values():
+            recording_validator.records.sort(key=lambda record: positions[id(record[0])])
+            for serializer, field_name, message in recording_validator.validate():
+                if field_name is None:
+                    field_name = "non_field_errors"
+                serializer._errors.setdefault(field_name, []).append(message)
+                serializer._validated_data = {}
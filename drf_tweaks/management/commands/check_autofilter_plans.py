@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand, CommandError
+from drf_tweaks.query_plans import get_autofilter_views, run_checks
+
+
+class Command(BaseCommand):
+    help = (
+        "Explains representative filtering & ordering queries of autofilter-decorated views and reports full table "
+        "scans & filesorts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--urlconf", help="Urlconf to look for the views in, ROOT_URLCONF by default.")
+        parser.add_argument("--show-plans", action="store_true", help="Show plans of all the queries.")
+        parser.add_argument("--fail-on-problems", action="store_true", help="Exit with error if problems are found.")
+
+    def handle(self, *args, **options):
+        problems = 0
+        for view_class in get_autofilter_views(options["urlconf"]):
+            for check in run_checks(view_class):
+                style = self.style.ERROR if check.problems else self.style.SUCCESS
+                self.stdout.write(style(str(check)))
+                if options["show_plans"] or (check.problems and options["verbosity"] > 1):
+                    self.stdout.write(check.plan)
+                problems += bool(check.problems)
+
+        if problems and options["fail_on_problems"]:
+            raise CommandError(f"{problems} queries with problems found.")
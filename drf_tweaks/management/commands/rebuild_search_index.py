@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.urls import get_resolver
+from drf_tweaks.search import get_search_indexes
+
+
+class Command(BaseCommand):
+    help = "Creates (or recreates) full text search indexes of autofilter-decorated views and indexes all the objects."
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help="Models (app_label.ModelName) to rebuild, all by default.")
+        parser.add_argument("--urlconf", help="Urlconf to look for the views in, ROOT_URLCONF by default.")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to rebuild the indexes in.")
+
+    def handle(self, *args, **options):
+        # search indexes are registered by views' decorators
+        get_resolver(options["urlconf"]).url_patterns
+        search_indexes = {search_index.model._meta.label_lower: search_index for search_index in get_search_indexes()}
+
+        labels = [label.lower() for label in options["models"]] or sorted(search_indexes)
+        for label in labels:
+            if label not in search_indexes:
+                raise CommandError(f"No full text search index registered for {label}.")
+            search_indexes[label].rebuild(options["database"])
+            self.stdout.write(self.style.SUCCESS(f"{label}: rebuilt ({', '.join(search_indexes[label].fields)})"))
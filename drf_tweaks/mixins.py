@@ -1,5 +1,116 @@
-from collections import deque
-from rest_framework.exceptions import NotFound, ValidationError
+import django
+import hashlib
+import json
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from django.apps import apps
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.db import connections, models, transaction
+from django.db.models import F, prefetch_related_objects, Q, QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone, translation
+from drf_tweaks.bulk_validation import BulkValidator
+from drf_tweaks.parsers import JSONArrayStream, StreamingJSONArrayParser
+from functools import reduce
+from operator import or_
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import ModelSerializer
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class BulkEditConflictError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Items have been changed in the meantime."
+    default_code = "conflict"
+
+
+class IdempotencyKeyInUseError(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this idempotency key is still being processed."
+    default_code = "idempotency_key_in_use"
+
+
+class IdempotencyKeyReusedError(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This idempotency key has already been used with a different payload."
+    default_code = "idempotency_key_reused"
+
+
+class CacheIdempotencyStore(object):
+    """Default store of responses for idempotency keys - Django cache"""
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+
+    def add(self, key, value, timeout):
+        """Stores the value only if the key is not stored yet, returns True if it was stored"""
+        return caches[self.cache_alias].add(key, value, timeout)
+
+    def get(self, key):
+        return caches[self.cache_alias].get(key)
+
+    def set(self, key, value, timeout):
+        caches[self.cache_alias].set(key, value, timeout)
+
+    def delete(self, key):
+        caches[self.cache_alias].delete(key)
+
+
+class ThreadPoolBulkEditExecutor(object):
+    """Default executor of background bulk edit jobs - in-process thread pool, shared by all views"""
+    _pool = None
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+
+    def get_pool(self):
+        if ThreadPoolBulkEditExecutor._pool is None:
+            ThreadPoolBulkEditExecutor._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return ThreadPoolBulkEditExecutor._pool
+
+    def submit(self, function, *args, **kwargs):
+        def run():
+            try:
+                function(*args, **kwargs)
+            finally:
+                # database connections are per thread
+                connections.close_all()
+
+        return self.get_pool().submit(run)
+
+
+def _setup_validation_process():
+    # processes started with "spawn" or "forkserver" do not inherit the loaded apps
+    if not apps.ready:
+        django.setup()
+
+
+def _validate_bulk_edit_item(job):
+    """
+    Validates a copy of bulk edit item's serializer, in a thread or another process of BULK_EDIT_VALIDATION_EXECUTOR
+    - job & results are picklable. Returns validated data, errors and values recorded by unique validators.
+    """
+    serializer_class, kwargs, prefetched_objects, db, language, view_name = job
+    serializer = serializer_class(**kwargs)
+    bulk_validator = BulkValidator([serializer], prefetched_objects=prefetched_objects)
+
+    def block_queries(execute, sql, params, many, context):
+        raise ImproperlyConfigured(
+            f"'{serializer_class.__name__}' runs database queries during validation, which is not allowed with "
+            f"BULK_EDIT_PARALLEL_VALIDATION of '{view_name}' - disable it or move the queries out of the "
+            f"validation: {sql}"
+        )
+
+    # language & database connections are per thread
+    with translation.override(language), connections[db].execute_wrapper(block_queries):
+        serializer.is_valid()
+    return serializer._validated_data, serializer._errors, bulk_validator.get_records(serializer)
 
 
 class BulkEditAPIMixin(object):
@@ -7,6 +118,47 @@ class BulkEditAPIMixin(object):
     # how many items can be edited at once, disabled if None
     BULK_EDIT_MAX_ITEMS = None
     BULK_EDIT_ALLOW_DELETE_ITEMS = False
+    # run creates, updates and deletes as bulk_create, bulk_update and a single delete query
+    BULK_EDIT_BATCHED = False
+    # resolve unique validators and primary key related fields with one query per validator/field for all items
+    BULK_EDIT_BATCHED_VALIDATION = False
+    # run is_valid of items in parallel (requires BULK_EDIT_BATCHED_VALIDATION, database queries are not allowed during
+    # the validation); executor is an object with map(function, items) method, shared process pool if None
+    BULK_EDIT_PARALLEL_VALIDATION = False
+    BULK_EDIT_VALIDATION_EXECUTOR = None
+    _validation_executor = None
+    # response after successful bulk edit: "list" (whole list, as GET), "objects" (affected objects only),
+    # "ids" (ids of affected objects only) or "empty" (204 No Content)
+    BULK_EDIT_RESPONSE = "list"
+    # run the bulk edit in a transaction, locking updated & deleted rows (select_for_update) in primary key order
+    BULK_EDIT_ATOMIC = False
+    # optimistic concurrency control: name of the version (integer) or updated_at (datetime) field of the model; updated
+    # and deleted items must pass its current value, the change is applied only if it has not changed in the meantime
+    BULK_EDIT_VERSION_FIELD = None
+    # payloads with more items are processed in the background (202 with job id), disabled if None
+    BULK_EDIT_ASYNC_THRESHOLD = None
+    BULK_EDIT_ASYNC_CHUNK_SIZE = 100
+    # executor of background jobs - object with submit(function, *args) method, ThreadPoolBulkEditExecutor if None
+    BULK_EDIT_ASYNC_EXECUTOR = None
+    BULK_EDIT_JOBS_CACHE_ALIAS = "default"
+    BULK_EDIT_JOBS_TIMEOUT = 24 * 60 * 60
+    BULK_EDIT_JOB_QUERY_PARAM = "bulk_edit_job"
+    # parse JSON payload incrementally and process it in chunks; with BULK_EDIT_STREAMING_ATOMIC all chunks are saved
+    # in one transaction, otherwise chunks before the failing one stay saved
+    BULK_EDIT_STREAMING = False
+    BULK_EDIT_STREAMING_CHUNK_SIZE = 1000
+    BULK_EDIT_STREAMING_ATOMIC = True
+    # do not save updated items without changes, and update only changed columns of the others
+    BULK_EDIT_SKIP_UNCHANGED = False
+    # replay the first successful response for requests with the same Idempotency-Key header & payload
+    BULK_EDIT_IDEMPOTENCY = False
+    BULK_EDIT_IDEMPOTENCY_HEADER = "Idempotency-Key"
+    # store of responses - object with add, get, set & delete methods, CacheIdempotencyStore if None
+    BULK_EDIT_IDEMPOTENCY_STORE = None
+    BULK_EDIT_IDEMPOTENCY_TIMEOUT = 24 * 60 * 60
+    # how long the key is locked by a request in progress - in case the worker is killed before releasing it; should be
+    # longer than the longest request (e.g. the worker timeout)
+    BULK_EDIT_IDEMPOTENCY_LOCK_TIMEOUT = 60
 
     def _get_item_id_key(self, item):
         """Items use id for update and delete and temp_id for create"""
@@ -38,9 +190,26 @@ class BulkEditAPIMixin(object):
 
         return items
 
+    def get_bulk_edit_queryset(self):
+        """
+        Queryset of updated & deleted objects. In BULK_EDIT_ATOMIC mode rows are locked in primary key order, so
+        concurrent bulk edits wait for each other instead of deadlocking. Only rows of the model are locked (of=self),
+        also when get_queryset uses select_related - which is compatible with query_lock_limiter.
+        """
+        queryset = self.get_queryset()
+        if not self.BULK_EDIT_ATOMIC:
+            return queryset
+
+        features = connections[queryset.db].features
+        # "of" is ignored by databases without select_for_update, but fails on databases that do not support it
+        of = ("self", ) if features.has_select_for_update_of or not features.has_select_for_update else ()
+        return queryset.select_for_update(of=of).order_by("pk")
+
     def _perform_bulk_edit(self, items):
         update_delete_ids = set(items["update"].keys()) | set(items["delete"].keys())
-        update_delete_objects = {item.id: item for item in self.get_queryset().filter(id__in=update_delete_ids)}
+        update_delete_objects = {
+            item.id: item for item in self.get_bulk_edit_queryset().filter(id__in=update_delete_ids)
+        }
         update_delete_objects_ids = set(update_delete_objects.keys())
         if update_delete_ids != update_delete_objects_ids:
             not_found_ids = update_delete_ids - update_delete_objects_ids
@@ -48,35 +217,301 @@ class BulkEditAPIMixin(object):
                 [{"id": item_id, "non_field_errors": ["This item does not exist."]} for item_id in not_found_ids]
             )
 
-        errors = []
-        actions = deque()
+        versions = self._get_bulk_edit_versions(items, update_delete_objects) if self.BULK_EDIT_VERSION_FIELD else {}
+
+        bulk_edit_items = []
         for change_type in items:
             for item_id, item in items[change_type].items():
                 if change_type == "create":
                     instance = None
                     serializer = self.get_serializer(data=item)
-                    action = serializer.save
                 elif change_type in ["update", "delete"]:
                     instance = update_delete_objects[item_id]
                     serializer = self.get_details_serializer(instance=instance, data=item, partial=True)
-                    action = {"update": serializer.save, "delete": instance.delete}[change_type]
 
-                id_key = self._get_item_id_key(item)
-                if serializer and not serializer.is_valid():
-                    item_error = {id_key: item_id}
-                    item_error.update(serializer.errors)
-                    errors.append(item_error)
-                    continue
+                bulk_edit_items.append((change_type, self._get_item_id_key(item), item_id, serializer, instance))
+
+        self._validate_bulk_edit_items(bulk_edit_items)
 
-                # success - change can be made
-                actions.append(action)
+        errors = []
+        actions = []
+        item_ids = []
+        for change_type, id_key, item_id, serializer, instance in bulk_edit_items:
+            if serializer and serializer.errors:
+                item_error = {id_key: item_id}
+                item_error.update(serializer.errors)
+                errors.append(item_error)
+                continue
+
+            # success - change can be made
+            actions.append((change_type, serializer, instance))
+            item_ids.append(item_id)
 
         if errors:
             raise ValidationError(errors)
 
         # perform actions if valdiation passed
-        for action in actions:
-            action()
+        if versions:
+            with transaction.atomic(using=self.get_queryset().db):
+                self._claim_bulk_edit_versions(versions, update_delete_objects)
+                self._execute_bulk_edit_actions(actions)
+        else:
+            self._execute_bulk_edit_actions(actions)
+
+        affected_ids = {"create": {}, "update": [], "delete": []}
+        for item_id, (change_type, serializer, _) in zip(item_ids, actions):
+            if change_type == "create":
+                affected_ids["create"][item_id] = serializer.instance.pk
+            else:
+                affected_ids[change_type].append(item_id)
+        return affected_ids
+
+    def _get_bulk_edit_versions(self, items, objects):
+        """
+        Takes versions out of updated & deleted items (so they are not saved by serializers) and checks them against
+        loaded objects. Returns mapping of item id to its version.
+        """
+        field = self.get_queryset().model._meta.get_field(self.BULK_EDIT_VERSION_FIELD)
+        versions = {}
+        errors = []
+        conflicts = []
+        for change_type in ["update", "delete"]:
+            for item_id, item in items[change_type].items():
+                item = items[change_type][item_id] = dict(item)
+                try:
+                    versions[item_id] = field.to_python(item.pop(field.name))
+                except KeyError:
+                    errors.append({"id": item_id, field.name: ["This field is required."]})
+                except DjangoValidationError as e:
+                    errors.append({"id": item_id, field.name: e.messages})
+                else:
+                    if getattr(objects[item_id], field.attname) != versions[item_id]:
+                        conflicts.append(item_id)
+
+        if errors:
+            raise ValidationError(errors)
+        if conflicts:
+            self._raise_bulk_edit_conflict(conflicts)
+        return versions
+
+    def _claim_bulk_edit_versions(self, versions, objects):
+        """
+        Bumps versions of all updated & deleted objects with one conditional UPDATE ... WHERE (id, version) matches.
+        Should be called in a transaction - if any object has been changed after loading, the transaction is rolled
+        back with conflict error.
+        """
+        model = self.get_queryset().model
+        field = model._meta.get_field(self.BULK_EDIT_VERSION_FIELD)
+        if isinstance(field, models.DateTimeField):
+            now = timezone.now()
+            new_versions = {item_id: now for item_id in versions}
+            value = now
+        else:
+            new_versions = {item_id: version + 1 for item_id, version in versions.items()}
+            value = F(field.attname) + 1
+
+        condition = reduce(or_, [Q(pk=item_id, **{field.attname: version}) for item_id, version in versions.items()])
+        updated = model._base_manager.filter(condition).update(**{field.attname: value})
+        if updated != len(versions):
+            current_versions = dict(model._base_manager.filter(pk__in=versions.keys()).values_list("pk", field.attname))
+            self._raise_bulk_edit_conflict(
+                [item_id for item_id in versions if current_versions.get(item_id) != new_versions[item_id]]
+            )
+
+        for item_id, version in new_versions.items():
+            setattr(objects[item_id], field.attname, version)
+
+    def _raise_bulk_edit_conflict(self, item_ids):
+        raise BulkEditConflictError([
+            {"id": item_id, self.BULK_EDIT_VERSION_FIELD: ["This item has been changed in the meantime."]}
+            for item_id in item_ids
+        ])
+
+    def _validate_bulk_edit_items(self, bulk_edit_items):
+        serializers = [serializer for _, _, _, serializer, _ in bulk_edit_items if serializer]
+        bulk_validator = BulkValidator(serializers) if self.BULK_EDIT_BATCHED_VALIDATION else None
+        if self.BULK_EDIT_PARALLEL_VALIDATION:
+            assert bulk_validator, (
+                f"'{self.__class__.__name__}' should set BULK_EDIT_BATCHED_VALIDATION "
+                "to use BULK_EDIT_PARALLEL_VALIDATION."
+            )
+            language = translation.get_language()
+            db = self.get_queryset().db
+            context = self.get_bulk_edit_validation_context()
+            jobs = [
+                (
+                    serializer.__class__,
+                    {
+                        "instance": serializer.instance, "data": serializer.initial_data,
+                        "partial": serializer.partial, "context": context,
+                    },
+                    bulk_validator.get_prefetched_objects(serializer),
+                    db,
+                    language,
+                    self.__class__.__name__,
+                )
+                for serializer in serializers
+            ]
+            # results come in the order of jobs
+            results = self.get_bulk_edit_validation_executor().map(_validate_bulk_edit_item, jobs)
+            for serializer, (validated_data, errors, records) in zip(serializers, results):
+                serializer._validated_data = validated_data
+                serializer._errors = errors
+                bulk_validator.add_records(serializer, records)
+        else:
+            for serializer in serializers:
+                serializer.is_valid()
+        if bulk_validator:
+            bulk_validator.validate()
+
+    def get_bulk_edit_validation_context(self):
+        """Context of serializers validated in parallel - sent to the executor, so it must be picklable"""
+        return {}
+
+    def get_bulk_edit_validation_executor(self):
+        if self.BULK_EDIT_VALIDATION_EXECUTOR is not None:
+            return self.BULK_EDIT_VALIDATION_EXECUTOR
+        if BulkEditAPIMixin._validation_executor is None:
+            BulkEditAPIMixin._validation_executor = ProcessPoolExecutor(initializer=_setup_validation_process)
+        return BulkEditAPIMixin._validation_executor
+
+    def _execute_bulk_edit_actions(self, actions):
+        if self.BULK_EDIT_SKIP_UNCHANGED:
+            actions = [
+                (change_type, serializer, instance) for change_type, serializer, instance in actions
+                if change_type != "update" or self._get_changed_fields(serializer) != set()
+            ]
+
+        if not self.BULK_EDIT_BATCHED:
+            for change_type, serializer, instance in actions:
+                if change_type == "delete":
+                    instance.delete()
+                elif change_type == "update" and self.BULK_EDIT_SKIP_UNCHANGED:
+                    self._save_changed_fields(serializer)
+                else:
+                    serializer.save()
+            return
+
+        grouped_actions = {"create": [], "update": [], "delete": []}
+        for change_type, serializer, instance in actions:
+            grouped_actions[change_type].append(instance if change_type == "delete" else serializer)
+
+        if grouped_actions["create"]:
+            self.perform_bulk_create(grouped_actions["create"])
+        if grouped_actions["update"]:
+            self.perform_bulk_update(grouped_actions["update"])
+        if grouped_actions["delete"]:
+            self.perform_bulk_delete(grouped_actions["delete"])
+
+    def _can_save_in_bulk(self, serializer, model):
+        """Only plain model serializers with concrete, non many-to-many fields can be saved with bulk queries"""
+        serializer_class = type(serializer)
+        if serializer_class.create is not ModelSerializer.create:
+            return False
+        if serializer_class.update is not ModelSerializer.update:
+            return False
+
+        for field_name in serializer.validated_data:
+            try:
+                field = model._meta.get_field(field_name)
+            except FieldDoesNotExist:
+                return False
+            if not field.concrete or field.many_to_many:
+                return False
+        return True
+
+    def _get_changed_fields(self, serializer):
+        """
+        Names of fields with validated values different than values of the instance, None if it cannot be determined
+        (custom update, many-to-many or non-model fields). Related objects are compared by their keys, without
+        fetching them.
+        """
+        model = type(serializer.instance)
+        if not self._can_save_in_bulk(serializer, model):
+            return None
+
+        changed_fields = set()
+        for field_name, value in serializer.validated_data.items():
+            field = model._meta.get_field(field_name)
+            if field.is_relation and value is not None:
+                value = getattr(value, field.target_field.attname)
+            if getattr(serializer.instance, field.attname) != value:
+                changed_fields.add(field_name)
+        return changed_fields
+
+    def _get_auto_now_fields(self, model):
+        return [field for field in model._meta.concrete_fields if getattr(field, "auto_now", False)]
+
+    def _save_changed_fields(self, serializer):
+        changed_fields = self._get_changed_fields(serializer)
+        if changed_fields is None:
+            serializer.save()
+            return
+
+        for field_name in changed_fields:
+            setattr(serializer.instance, field_name, serializer.validated_data[field_name])
+        auto_now_fields = {field.name for field in self._get_auto_now_fields(type(serializer.instance))}
+        serializer.instance.save(update_fields=changed_fields | auto_now_fields)
+
+    def perform_bulk_create(self, serializers):
+        """
+        Creates objects with a single bulk_create. Serializers with custom create, many-to-many fields, and all
+        serializers on databases that cannot return primary keys from bulk insert are saved one by one.
+        Override it if objects need per-object side effects (e.g. perform_create).
+        """
+        model = self.get_queryset().model
+        features = connections[self.get_queryset().db].features
+        can_return_pks = getattr(features, "can_return_rows_from_bulk_insert",
+                                 getattr(features, "can_return_ids_from_bulk_insert", False))
+
+        bulk_serializers = []
+        for serializer in serializers:
+            if can_return_pks and self._can_save_in_bulk(serializer, model):
+                bulk_serializers.append(serializer)
+            else:
+                serializer.save()
+
+        if bulk_serializers:
+            objects = model._default_manager.bulk_create(
+                [model(**serializer.validated_data) for serializer in bulk_serializers]
+            )
+            for serializer, obj in zip(bulk_serializers, objects):
+                serializer.instance = obj
+
+    def perform_bulk_update(self, serializers):
+        """
+        Updates objects with bulk_update - one query per set of changed fields (with BULK_EDIT_SKIP_UNCHANGED only
+        fields with values different than the loaded ones, otherwise all the passed fields). Serializers with custom
+        update and many-to-many fields are saved one by one. Override it if objects need per-object side effects
+        (e.g. perform_update).
+        """
+        model = self.get_queryset().model
+        auto_now_fields = self._get_auto_now_fields(model)
+        objects_by_fields = defaultdict(list)
+        for serializer in serializers:
+            if not self._can_save_in_bulk(serializer, model):
+                serializer.save()
+                continue
+
+            if self.BULK_EDIT_SKIP_UNCHANGED:
+                changed_fields = self._get_changed_fields(serializer)
+            else:
+                changed_fields = serializer.validated_data.keys()
+            for field_name, value in serializer.validated_data.items():
+                setattr(serializer.instance, field_name, value)
+            for field in auto_now_fields:
+                field.pre_save(serializer.instance, False)
+            fields = frozenset(changed_fields) | {field.name for field in auto_now_fields}
+            if fields:
+                objects_by_fields[fields].append(serializer.instance)
+
+        for fields, objects in objects_by_fields.items():
+            model._default_manager.bulk_update(objects, sorted(fields))
+
+    def perform_bulk_delete(self, instances):
+        """Deletes objects with a single query. Override it if objects need per-object side effects"""
+        model = type(instances[0])
+        model._default_manager.filter(pk__in=[instance.pk for instance in instances]).delete()
 
     def get_details_serializer_class(self):
         assert self.details_serializer_class is not None, (
@@ -91,8 +526,75 @@ class BulkEditAPIMixin(object):
         kwargs["context"] = self.get_serializer_context()
         return serializer_class(*args, **kwargs)
 
+    def get_parsers(self):
+        parsers = super().get_parsers()
+        if self.BULK_EDIT_STREAMING and self.request.method == "PUT":
+            parsers.insert(0, StreamingJSONArrayParser())
+        return parsers
+
     def put(self, request, *args, **kwargs):
         """Bulk edit for member medications"""
+        idempotency_key = request.headers.get(self.BULK_EDIT_IDEMPOTENCY_HEADER)
+        if self.BULK_EDIT_IDEMPOTENCY and idempotency_key:
+            return self._idempotent_bulk_edit(idempotency_key, request, *args, **kwargs)
+        return self._bulk_edit(request, *args, **kwargs)
+
+    def get_idempotency_store(self):
+        return self.BULK_EDIT_IDEMPOTENCY_STORE or CacheIdempotencyStore()
+
+    def _get_bulk_edit_user_id(self, request):
+        return request.user.pk if request.user and request.user.is_authenticated else None
+
+    def _get_idempotency_store_key(self, idempotency_key, request):
+        user_id = self._get_bulk_edit_user_id(request)
+        return hashlib.md5(f"{request.path}:{user_id}:{idempotency_key}".encode("utf-8")).hexdigest()
+
+    def _get_payload_hash(self, request):
+        # streamed payloads are not read in advance, so only the key is checked for them
+        if isinstance(request.data, JSONArrayStream):
+            return None
+        return hashlib.sha256(json.dumps(request.data, sort_keys=True, cls=JSONEncoder).encode("utf-8")).hexdigest()
+
+    def _idempotent_bulk_edit(self, idempotency_key, request, *args, **kwargs):
+        """
+        The first successful response for the key (scoped by the path & user) is stored and replayed for retries,
+        without touching the database. Failed requests are not stored, so they can be retried. While the request is in
+        progress the key is locked for BULK_EDIT_IDEMPOTENCY_LOCK_TIMEOUT only.
+        """
+        store = self.get_idempotency_store()
+        key = f"drf_tweaks_idempotency:{self._get_idempotency_store_key(idempotency_key, request)}"
+        payload_hash = self._get_payload_hash(request)
+        if not store.add(key, {"hash": payload_hash, "response": None}, self.BULK_EDIT_IDEMPOTENCY_LOCK_TIMEOUT):
+            stored = store.get(key)
+            if stored is not None:
+                if stored["hash"] != payload_hash:
+                    raise IdempotencyKeyReusedError()
+                if stored["response"] is None:
+                    raise IdempotencyKeyInUseError()
+                response = Response(stored["response"]["data"], status=stored["response"]["status"])
+                response["Idempotent-Replayed"] = "true"
+                return response
+
+        stored = False
+        try:
+            response = self._bulk_edit(request, *args, **kwargs)
+            store.set(
+                key,
+                {"hash": payload_hash, "response": {"data": response.data, "status": response.status_code}},
+                self.BULK_EDIT_IDEMPOTENCY_TIMEOUT,
+            )
+            stored = True
+        finally:
+            # also on SystemExit etc. (e.g. worker timeout) - otherwise retries would be locked out
+            if not stored:
+                store.delete(key)
+        return response
+
+    def _bulk_edit(self, request, *args, **kwargs):
+        if isinstance(request.data, JSONArrayStream):
+            affected_ids = self._run_streaming_bulk_edit(request.data)
+            return self.get_bulk_edit_response(request, affected_ids, *args, **kwargs)
+
         if not isinstance(request.data, list):
             raise ValidationError({"non_field_errors": ["Payload for bulk edit must be a list of objects to edit."]})
 
@@ -102,5 +604,296 @@ class BulkEditAPIMixin(object):
             )
 
         items = self._get_bulk_edit_items(request.data)
-        self._perform_bulk_edit(items)
+        if self.BULK_EDIT_ASYNC_THRESHOLD and len(request.data) > self.BULK_EDIT_ASYNC_THRESHOLD:
+            return self.start_bulk_edit_job(request, items)
+
+        affected_ids = self._run_bulk_edit(items)
+        return self.get_bulk_edit_response(request, affected_ids, *args, **kwargs)
+
+    def get(self, request, *args, **kwargs):
+        job_id = request.query_params.get(self.BULK_EDIT_JOB_QUERY_PARAM)
+        if job_id and self.BULK_EDIT_ASYNC_THRESHOLD:
+            job = self.get_bulk_edit_job(job_id)
+            # jobs are visible only to users who started them
+            if job is None or job.get("user_id") != self._get_bulk_edit_user_id(request):
+                raise NotFound()
+            return Response({key: value for key, value in job.items() if key != "user_id"})
+
+        return super().get(request, *args, **kwargs)
+
+    def _iter_bulk_edit_chunks(self, data):
+        chunk = []
+        for number, request_item in enumerate(data, 1):
+            if self.BULK_EDIT_MAX_ITEMS and number > self.BULK_EDIT_MAX_ITEMS:
+                raise ValidationError(
+                    {"non_field_errors": [f"Cannot edit more than {self.BULK_EDIT_MAX_ITEMS} items at once."]}
+                )
+            chunk.append(request_item)
+            if len(chunk) == self.BULK_EDIT_STREAMING_CHUNK_SIZE:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _run_streaming_bulk_edit(self, data):
+        """
+        Items are read, classified, validated & saved in chunks of BULK_EDIT_STREAMING_CHUNK_SIZE (in payload order),
+        so only one chunk is held in memory. Processing stops at the first chunk with errors - with
+        BULK_EDIT_STREAMING_ATOMIC the earlier chunks are rolled back, otherwise they stay saved.
+        """
+        affected_ids = {"create": {}, "update": [], "delete": []}
+        atomic = transaction.atomic(using=self.get_queryset().db) if self.BULK_EDIT_STREAMING_ATOMIC else nullcontext()
+        with atomic:
+            for chunk in self._iter_bulk_edit_chunks(data):
+                chunk_affected_ids = self._run_bulk_edit(self._get_bulk_edit_items(chunk))
+                affected_ids["create"].update(chunk_affected_ids["create"])
+                affected_ids["update"].extend(chunk_affected_ids["update"])
+                affected_ids["delete"].extend(chunk_affected_ids["delete"])
+        return affected_ids
+
+    def _run_bulk_edit(self, items):
+        if self.BULK_EDIT_ATOMIC:
+            with transaction.atomic(using=self.get_queryset().db):
+                return self._perform_bulk_edit(items)
+        return self._perform_bulk_edit(items)
+
+    def get_bulk_edit_executor(self):
+        return self.BULK_EDIT_ASYNC_EXECUTOR or ThreadPoolBulkEditExecutor()
+
+    def _get_bulk_edit_job_key(self, job_id):
+        return f"drf_tweaks_bulk_edit_job:{job_id}"
+
+    def get_bulk_edit_job(self, job_id):
+        return caches[self.BULK_EDIT_JOBS_CACHE_ALIAS].get(self._get_bulk_edit_job_key(job_id))
+
+    def _save_bulk_edit_job(self, job):
+        caches[self.BULK_EDIT_JOBS_CACHE_ALIAS].set(
+            self._get_bulk_edit_job_key(job["id"]), job, self.BULK_EDIT_JOBS_TIMEOUT
+        )
+
+    def start_bulk_edit_job(self, request, items):
+        """Stores the job and passes it to the executor, returns 202 with job id & url of the job's status"""
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": self._get_bulk_edit_user_id(request),
+            "status": "pending",
+            "total": sum(len(items[change_type]) for change_type in items),
+            "processed": 0,
+            "failed": 0,
+            "errors": [],
+        }
+        self._save_bulk_edit_job(job)
+        response = Response(
+            {
+                "id": job["id"],
+                "status": job["status"],
+                "url": replace_query_param(request.build_absolute_uri(), self.BULK_EDIT_JOB_QUERY_PARAM, job["id"]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+        self.get_bulk_edit_executor().submit(self._process_bulk_edit_job, job, items)
+        return response
+
+    def _process_bulk_edit_job_chunk(self, chunk_items):
+        """
+        Saves the chunk as a single bulk edit. If it fails, its items are saved one by one - so valid items of the
+        chunk are saved too, and every item which is not saved has its own error. Returns errors & number of failed
+        items.
+        """
+        try:
+            self._run_bulk_edit(self._group_bulk_edit_job_items(chunk_items))
+            return [], 0
+        except (NotFound, ValidationError, BulkEditConflictError):
+            if len(chunk_items) == 1:
+                raise
+
+        errors = []
+        failed = 0
+        for item in chunk_items:
+            try:
+                self._run_bulk_edit(self._group_bulk_edit_job_items([item]))
+            except (NotFound, ValidationError, BulkEditConflictError) as e:
+                errors.extend(e.detail if isinstance(e.detail, list) else [e.detail])
+                failed += 1
+        return errors, failed
+
+    def _group_bulk_edit_job_items(self, flat_items):
+        grouped = {"create": {}, "update": {}, "delete": {}}
+        for change_type, item_id, item in flat_items:
+            grouped[change_type][item_id] = item
+        return grouped
+
+    def _process_bulk_edit_job(self, job, items):
+        """
+        Items are processed in chunks of BULK_EDIT_ASYNC_CHUNK_SIZE, each chunk is validated & saved separately (as a
+        single synchronous bulk edit). Items of a chunk with errors are retried one by one, so only the incorrect items
+        are not saved - each of them with its error in job's errors, and counted in job's failed.
+        """
+        job["status"] = "running"
+        self._save_bulk_edit_job(job)
+        flat_items = [
+            (change_type, item_id, item) for change_type in items for item_id, item in items[change_type].items()
+        ]
+        try:
+            for start in range(0, len(flat_items), self.BULK_EDIT_ASYNC_CHUNK_SIZE):
+                chunk_items = flat_items[start:start + self.BULK_EDIT_ASYNC_CHUNK_SIZE]
+                try:
+                    errors, failed = self._process_bulk_edit_job_chunk(chunk_items)
+                except (NotFound, ValidationError, BulkEditConflictError) as e:
+                    errors, failed = e.detail if isinstance(e.detail, list) else [e.detail], len(chunk_items)
+                job["errors"].extend(errors)
+                job["failed"] += failed
+                job["processed"] += len(chunk_items)
+                self._save_bulk_edit_job(job)
+        except Exception as e:
+            job["status"] = "failed"
+            job["errors"].append({"non_field_errors": [str(e)]})
+        else:
+            job["status"] = "finished"
+        self._save_bulk_edit_job(job)
+
+    def get_bulk_edit_response(self, request, affected_ids, *args, **kwargs):
+        """
+        Response after successful bulk edit, depending on BULK_EDIT_RESPONSE. affected_ids contains mapping of temp_id
+        to the id of created object ("create") and lists of ids of updated & deleted objects ("update", "delete").
+        """
+        assert self.BULK_EDIT_RESPONSE in ("list", "objects", "ids", "empty"), (
+            f"Incorrect BULK_EDIT_RESPONSE '{self.BULK_EDIT_RESPONSE}' in '{self.__class__.__name__}'."
+        )
+        if self.BULK_EDIT_RESPONSE == "list":
+            return self.list(request, *args, **kwargs)
+        if self.BULK_EDIT_RESPONSE == "empty":
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        if self.BULK_EDIT_RESPONSE == "ids":
+            return Response({
+                "created": {str(temp_id): pk for temp_id, pk in affected_ids["create"].items()},
+                "updated": affected_ids["update"],
+                "deleted": affected_ids["delete"],
+            })
+
+        # affected objects, fetched with one query (optimized by get_queryset, e.g. with AutoOptimizeMixin)
+        pks = set(affected_ids["create"].values()) | set(affected_ids["update"])
+        objects = self.get_queryset().in_bulk(pks) if pks else {}
+        data = {
+            pk: item_data
+            for pk, item_data in zip(objects.keys(), self.get_serializer(list(objects.values()), many=True).data)
+        }
+        return Response({
+            "created": {
+                str(temp_id): data[pk] for temp_id, pk in affected_ids["create"].items() if pk in data
+            },
+            "updated": [data[pk] for pk in affected_ids["update"] if pk in data],
+            "deleted": affected_ids["delete"],
+        })
+
+
+class NDJSONExportMixin(object):
+    """
+    Export mode for list views: ?export=ndjson streams the whole filtered & ordered queryset as newline-delimited JSON,
+    instead of returning a single page. Items are serialized with the same serializer (and fields filtering) as in the
+    paginated response.
+
+    Rows are read with QuerySet.iterator (which uses server-side cursors where the backend supports them) and
+    serialized in chunks of NDJSON_EXPORT_CHUNK_SIZE items - so the memory usage does not depend on the size of the
+    export. Prefetches of the queryset are performed per chunk.
+    """
+    NDJSON_EXPORT_QUERY_PARAM = "export"
+    NDJSON_EXPORT_CHUNK_SIZE = 1000
+
+    def iter_export_chunks(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            for start in range(0, len(queryset), self.NDJSON_EXPORT_CHUNK_SIZE):
+                yield list(queryset[start:start + self.NDJSON_EXPORT_CHUNK_SIZE])
+            return
+
+        chunk = []
+        for obj in queryset.iterator(chunk_size=self.NDJSON_EXPORT_CHUNK_SIZE):
+            chunk.append(obj)
+            if len(chunk) == self.NDJSON_EXPORT_CHUNK_SIZE:
+                prefetch_related_objects(chunk, *queryset._prefetch_related_lookups)
+                yield chunk
+                chunk = []
+        if chunk:
+            prefetch_related_objects(chunk, *queryset._prefetch_related_lookups)
+            yield chunk
+
+    def generate_ndjson(self, queryset):
+        for chunk in self.iter_export_chunks(queryset):
+            serializer = self.get_serializer(chunk, many=True)
+            yield "".join(json.dumps(item, cls=JSONEncoder, ensure_ascii=False) + "\n" for item in serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get(self.NDJSON_EXPORT_QUERY_PARAM) != "ndjson":
+            return super(NDJSONExportMixin, self).list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(self.generate_ndjson(queryset), content_type="application/x-ndjson")
+
+
+class _SafeMethodRequest(object):
+    """Request seen by permissions & throttles of a filter search - as GET, otherwise the same"""
+    method = "GET"
+
+    def __init__(self, request):
+        self._wrapped = request
+
+    def __getattr__(self, name):
+        return getattr(self._wrapped, name)
+
+
+class FilterSearchMixin(object):
+    """
+    Search endpoint for list views: POST ?filter_search with filters (and ordering, pagination etc. params) sent as
+    a JSON object in the body instead of the query string - e.g. for thousands of ids in __in filters, which would not
+    fit in the url. Lists are sent as comma separated values. Other POST requests are handled as usual.
+
+    The search is read-only, so permissions & throttles are checked as for GET - e.g. IsAuthenticatedOrReadOnly allows
+    it for anonymous users and DjangoModelPermissions does not require "add". Authentication (including the CSRF check
+    of SessionAuthentication) treats it as POST. Links of the response (e.g. pagination) carry the filters in the query
+    string, so following them with GET returns the same search.
+
+    POST /items/?filter_search
+    {"id__in": [1, 2, 3, "100..200"], "ordering": "-id"}
+    """
+    FILTER_SEARCH_QUERY_PARAM = "filter_search"
+
+    def is_filter_search(self, request):
+        return request.method == "POST" and self.FILTER_SEARCH_QUERY_PARAM in request.query_params
+
+    def check_permissions(self, request):
+        if self.is_filter_search(request):
+            request = _SafeMethodRequest(request)
+        return super(FilterSearchMixin, self).check_permissions(request)
+
+    def check_throttles(self, request):
+        if self.is_filter_search(request):
+            request = _SafeMethodRequest(request)
+        return super(FilterSearchMixin, self).check_throttles(request)
+
+    def post(self, request, *args, **kwargs):
+        if not self.is_filter_search(request):
+            if hasattr(super(FilterSearchMixin, self), "post"):
+                return super(FilterSearchMixin, self).post(request, *args, **kwargs)
+            return self.http_method_not_allowed(request, *args, **kwargs)
+        return self.filter_search(request, *args, **kwargs)
+
+    def get_filter_search_query_params(self, request):
+        if not isinstance(request.data, dict):
+            raise ValidationError({"non_field_errors": ["Expected a dictionary of filters."]})
+
+        query_params = request.query_params.copy()
+        query_params.pop(self.FILTER_SEARCH_QUERY_PARAM)
+        for key, value in request.data.items():
+            if isinstance(value, (list, tuple)):
+                value = ",".join(str(item) for item in value)
+            elif isinstance(value, bool):
+                value = "true" if value else "false"
+            query_params[key] = str(value) if value is not None else ""
+        return query_params
+
+    def filter_search(self, request, *args, **kwargs):
+        # filter backends read the filters from request.query_params, paginators build links from the query string
+        query_params = self.get_filter_search_query_params(request)
+        request._request.GET = query_params
+        request._request.META["QUERY_STRING"] = query_params.urlencode()
         return self.list(request, *args, **kwargs)
@@ -1,12 +1,33 @@
 # -*- coding: utf-8 -*-
+import binascii
+import datetime
+import hashlib
+import json
+import time
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from collections import OrderedDict
+from django.core.cache import caches
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import status
 from rest_framework.exceptions import APIException
-from rest_framework.pagination import (LimitOffsetPagination, NotFound, PageNumberPagination, remove_query_param,
-                                       replace_query_param)
+from rest_framework.pagination import (BasePagination, LimitOffsetPagination, NotFound, PageNumberPagination,
+                                       remove_query_param, replace_query_param)
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Sent by the paginators after each paginated request with arguments: paginator, request, view, offset (position of the
+# first row of the page, None for AnchorWindowPagination), page_size (requested), rows (returned), duration (seconds
+# spent on fetching rows), has_next and method of fetching rows: "offset", "cursor", "bookmark", "boundary" (see deep
+# pagination in NoCountsPaginationMixin) or "anchor".
+pagination_metrics = Signal()
 
 
 class IncorrectLimitOffsetError(APIException):
@@ -14,7 +35,499 @@ class IncorrectLimitOffsetError(APIException):
     default_detail = _('Incorrect offset or limit.')
 
 
-class NoCountsLimitOffsetPagination(LimitOffsetPagination):
+class DeepPaginationError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _('This page is too deep, please follow the "next" links instead.')
+
+
+class IncorrectAnchorError(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = _('Incorrect anchor, before or after.')
+
+
+def _get_keyset_ordering(queryset):
+    """
+    Returns ordering of the queryset as a tuple of field names that can be used for keyset (seek) pagination, with the
+    primary key appended as a tie-breaker (directions are flipped for reverse()). Returns None if the ordering cannot
+    be used that way - it has expressions, relations, nullable or non-concrete fields.
+    """
+    if not isinstance(queryset, QuerySet) or queryset._fields is not None:
+        # values() & values_list() querysets do not return model instances
+        return None
+
+    query = queryset.query
+    if query.order_by:
+        ordering = query.order_by
+    elif query.default_ordering:
+        ordering = queryset.model._meta.ordering
+    else:
+        ordering = ()
+
+    result = []
+    for item in ordering:
+        if not isinstance(item, str) or item == "?":
+            return None
+
+        descending = item.startswith("-")
+        name = item.lstrip("-")
+        if name != "pk":
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation or not field.concrete or field.null:
+                return None
+            if field.primary_key:
+                name = "pk"
+
+        result.append("-" + name if descending else name)
+        if name == "pk":
+            # primary key is unique, so anything after it does not change the order
+            break
+    else:
+        result.append("pk")
+
+    if not query.standard_ordering:
+        # reverse() of the queryset
+        result = _reverse_ordering(result)
+    return tuple(result)
+
+
+def _order_by_keyset(queryset, ordering):
+    """Queryset ordered by the keyset ordering (which already includes reverse() of the queryset)"""
+    if not queryset.query.standard_ordering:
+        queryset = queryset.reverse()
+    return queryset.order_by(*ordering)
+
+
+def _get_queryset_signature(queryset):
+    """Hash of the SQL (with params) of the queryset - the same for the same set of filters & ordering"""
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    signature = hashlib.md5(("%s|%r" % (sql, params)).encode("utf-8")).hexdigest()
+    return "%s:%s" % (queryset.model._meta.label_lower, signature)
+
+
+# aliases of caches with bookmarks (bookmarks_cache_alias of paginators) - their versions are invalidated on writes
+_bookmarks_cache_aliases = set()
+
+
+def _get_bookmarks_version_key(model):
+    return "drf_tweaks:bookmarks_version:%s" % model._meta.label_lower
+
+
+def _invalidate_bookmarks(sender, **kwargs):
+    """post_save & post_delete: rows may have been added, removed or moved, so bookmarks of the model are dropped"""
+    for cache_alias in _bookmarks_cache_aliases:
+        caches[cache_alias].delete(_get_bookmarks_version_key(sender))
+
+
+post_save.connect(_invalidate_bookmarks, dispatch_uid="drf_tweaks_invalidate_bookmarks")
+post_delete.connect(_invalidate_bookmarks, dispatch_uid="drf_tweaks_invalidate_bookmarks")
+
+
+def _send_pagination_metrics(paginator, view, **metrics):
+    pagination_metrics.send(
+        sender=paginator.__class__, paginator=paginator, request=paginator.request, view=view, **metrics
+    )
+
+
+def _reverse_ordering(ordering):
+    return tuple(item[1:] if item.startswith("-") else "-" + item for item in ordering)
+
+
+def _get_keyset_values(obj, ordering):
+    """Values of the ordering fields for a given model instance"""
+    values = {}
+    for item in ordering:
+        name = item.lstrip("-")
+        values[name] = obj.pk if name == "pk" else getattr(obj, obj._meta.get_field(name).attname)
+    return values
+
+
+def _get_keyset_fields_values(model, ordering, values):
+    """Ordering values decoded from a cursor, converted with ordering fields' to_python"""
+    result = {}
+    for item, value in zip(ordering, values):
+        name = item.lstrip("-")
+        field = model._meta.pk if name == "pk" else model._meta.get_field(name)
+        result[name] = field.to_python(value)
+    return result
+
+
+class _CursorJSONEncoder(DjangoJSONEncoder):
+    """Lossless encoding of datetimes & times - DjangoJSONEncoder cuts them to milliseconds"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _get_keyset_filter(ordering, values, reverse=False):
+    """Q object selecting rows placed after (or before, if reverse is set) the row with given ordering values"""
+    keyset_filter = Q()
+    for index, item in enumerate(ordering):
+        name = item.lstrip("-")
+        lookup = "lt" if item.startswith("-") != reverse else "gt"
+        condition = Q(**{"%s__%s" % (name, lookup): values[name]})
+        for previous_item in ordering[:index]:
+            previous_name = previous_item.lstrip("-")
+            condition &= Q(**{previous_name: values[previous_name]})
+        keyset_filter |= condition
+    return keyset_filter
+
+
+class ExactCount(object):
+    """Count strategy: plain COUNT(*)"""
+
+    def get_count(self, queryset):
+        """Returns tuple: (count, is_estimate)"""
+        if isinstance(queryset, QuerySet):
+            return queryset.count(), False
+        return len(queryset), False
+
+
+class CappedCount(object):
+    """
+    Count strategy: exact count, but no more than max_count - the database counts the limited subquery
+    (SELECT COUNT(*) FROM (SELECT ... LIMIT max_count + 1)), so it stops after max_count + 1 rows.
+    """
+
+    def __init__(self, max_count=1000):
+        self.max_count = max_count
+
+    def get_count(self, queryset):
+        if isinstance(queryset, QuerySet):
+            count = queryset.order_by()[:self.max_count + 1].count()
+        else:
+            count = len(queryset[:self.max_count + 1])
+
+        if count > self.max_count:
+            return self.max_count, True
+        return count, False
+
+
+class PlannerEstimateCount(object):
+    """
+    Count strategy: row estimate of the query planner (EXPLAIN) - PostgreSQL only, on other backends (or for
+    non-querysets) the fallback strategy is used. Estimates for small results are not reliable, so if the estimate is
+    below exact_below the exact count is performed.
+    """
+
+    def __init__(self, fallback=None, exact_below=1000):
+        self.fallback = fallback or ExactCount()
+        self.exact_below = exact_below
+
+    def get_estimate(self, queryset):
+        connection = connections[queryset.db]
+        sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def get_count(self, queryset):
+        if not isinstance(queryset, QuerySet) or connections[queryset.db].vendor != "postgresql":
+            return self.fallback.get_count(queryset)
+
+        estimate = self.get_estimate(queryset)
+        if estimate < self.exact_below:
+            return ExactCount().get_count(queryset)
+        return estimate, True
+
+
+class CachedCount(object):
+    """
+    Count strategy: count computed by the given strategy (exact by default) cached for timeout seconds. The cache key is
+    built from the SQL of the queryset without ordering, so each set of filters is cached separately. Counts served
+    from cache are reported as estimates, as they may be stale.
+    """
+
+    def __init__(self, timeout=60, cache_alias="default", strategy=None):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.strategy = strategy or ExactCount()
+
+    def get_cache_key(self, queryset):
+        return "drf_tweaks:count:%s" % _get_queryset_signature(queryset.order_by())
+
+    def get_count(self, queryset):
+        if not isinstance(queryset, QuerySet):
+            return self.strategy.get_count(queryset)
+
+        cache = caches[self.cache_alias]
+        cache_key = self.get_cache_key(queryset)
+        count = cache.get(cache_key)
+        if count is not None:
+            return count, True
+
+        count, is_estimate = self.strategy.get_count(queryset)
+        cache.set(cache_key, count, self.timeout)
+        return count, is_estimate
+
+
+class NoCountsPaginationMixin(object):
+    """
+    Common part of the paginators without counts.
+
+    deferred_join - if set, the page is fetched in two steps ("late row lookup"): first only primary keys of the page
+    are selected (so the database may skip over index entries instead of full rows), then full rows are fetched by those
+    keys and put in the original order. It makes large offsets on wide tables much cheaper.
+
+    count_strategy - opt-in count (ExactCount, CappedCount, PlannerEstimateCount, CachedCount or any object with
+    get_count(queryset) method returning (count, is_estimate) tuple). If set, the response contains "count" and
+    "count_is_estimate".
+
+    One extra row is always fetched, so the "next" link is present only if there really is a next page.
+
+    cursor_query_param - if set (for example to "cursor"), the "next" link carries a cursor hint: ordering values of the
+    last row of the page. The next request seeks to the hint (WHERE (ordering) > (hint)) instead of skipping rows. The
+    hint is used only for the position it was generated for and only if the ordering has not changed - otherwise (and
+    for orderings by nullable, relational or non-field values) the plain offset is used.
+
+    bookmarks_cache_alias - if set (to the alias of django cache, which may be a local memory cache), ordering values of
+    the last row of each page deeper than bookmarks_min_offset are remembered (for every set of filters & ordering) for
+    bookmarks_timeout seconds. A later request for a deep page seeks to the nearest preceding bookmark and skips only
+    the remaining rows. Bookmarks are stored under a version of the model, replaced on every post_save & post_delete of
+    it - rows added, removed or moved before a bookmark would shift the positions. Each bookmark is also verified before
+    use (the row must still exist & have the same ordering values), if it is stale, the plain offset is used. Changes
+    without signals (QuerySet.update, bulk_create, raw SQL, writes of related models) are not detected by the version,
+    so the timeout limits how long the positions may drift after them.
+
+    Deep pages guardrail (max_offset for limit/offset and max_page_number for page number pagination) - pages beyond the
+    limit are served only by seeking (keyset), so a single client walking deep offsets cannot dominate the database:
+        - deep_pagination_policy = "reject" - only requests with a cursor hint are served. Other requests get
+          DeepPaginationError, with the "next" link carrying a cursor hint for the deepest page within the limit.
+        - deep_pagination_policy = "keyset" - requires cursor_query_param. Additionally deep requests without a cursor
+          hint are served by seeking to the nearest bookmark or the row at the limit (fetched with a bounded offset),
+          as long as the remaining offset is not larger than the limit itself. Other requests get DeepPaginationError.
+    Ordering must consist of non-nullable, non-relational fields - otherwise all deep requests get DeepPaginationError.
+    """
+    deferred_join = False
+    count_strategy = None
+    cursor_query_param = None
+    bookmarks_cache_alias = None
+    bookmarks_min_offset = 1000
+    bookmarks_timeout = 600
+    bookmarks_max_count = 100
+    deep_pagination_policy = "reject"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.bookmarks_cache_alias:
+            _bookmarks_cache_aliases.add(cls.bookmarks_cache_alias)
+
+    def get_max_position(self):
+        """Position (offset) of the first row of the deepest page that may be served without seeking"""
+        raise NotImplementedError
+
+    def get_position_link(self, position):
+        raise NotImplementedError
+
+    def evaluate_count(self, queryset):
+        if self.count_strategy is None:
+            self.count, self.count_is_estimate = None, None
+        else:
+            self.count, self.count_is_estimate = self.count_strategy.get_count(queryset)
+
+    def can_defer_join(self, queryset):
+        if not self.deferred_join or not isinstance(queryset, QuerySet) or queryset.query.distinct:
+            return False
+        return queryset._fields is None and queryset.query.can_filter()
+
+    def fetch_rows(self, queryset, start, stop):
+        """Fetches rows [start:stop] - with one extra row, to check if there is a next page"""
+        started_at = time.perf_counter()
+        try:
+            if not self.can_defer_join(queryset):
+                rows = list(queryset[start:stop + 1])
+                self.has_next = len(rows) > stop - start
+                return rows[:stop - start]
+
+            ids = list(queryset.values_list("pk", flat=True)[start:stop + 1])
+            self.has_next = len(ids) > stop - start
+            ids = ids[:stop - start]
+            objects = {obj.pk: obj for obj in queryset.order_by().filter(pk__in=ids)}
+            return [objects[pk] for pk in ids if pk in objects]
+        finally:
+            self.fetch_duration += time.perf_counter() - started_at
+
+    def get_page_results(self, queryset, start, stop):
+        self.fetch_duration = 0
+        self.fetch_method = "offset"
+        max_position = self.get_max_position()
+        is_deep = max_position is not None and start > max_position
+        assert not is_deep or self.deep_pagination_policy == "reject" or self.cursor_query_param, (
+            f"{self.__class__.__name__} must have `cursor_query_param` set to use \"keyset\" deep pagination policy."
+        )
+
+        self.ordering = None
+        if self.cursor_query_param or self.bookmarks_cache_alias or max_position is not None:
+            self.ordering = _get_keyset_ordering(queryset)
+        if self.ordering is None:
+            if is_deep:
+                raise DeepPaginationError
+            return self.fetch_rows(queryset, start, stop)
+
+        queryset = _order_by_keyset(queryset, self.ordering)
+        # read before the rows, so bookmarks of rows read before a write are not stored under the new version
+        self.bookmarks_version = None
+        if self.bookmarks_cache_alias and stop >= self.bookmarks_min_offset:
+            self.bookmarks_version = self.get_bookmarks_version(queryset.model)
+        seek_position, seek_values = start, self.get_cursor_values(queryset, start)
+        seek_method = "cursor"
+        boundary_position, boundary_values = None, None
+        if seek_values is None and (not is_deep or self.deep_pagination_policy == "keyset"):
+            seek_position, seek_values = self.get_bookmark(queryset, start)
+            seek_method = "bookmark"
+            if is_deep and (seek_values is None or seek_position < max_position):
+                boundary_position, boundary_values = self.get_boundary(queryset, max_position)
+                seek_position, seek_values = boundary_position, boundary_values
+                seek_method = "boundary"
+
+        results = None
+        if seek_values is not None and (not is_deep or start - seek_position <= max_position):
+            try:
+                seek_queryset = queryset.filter(_get_keyset_filter(self.ordering, seek_values))
+            except (ValueError, TypeError, DjangoValidationError):
+                pass  # malformed cursor - falling back to offset
+            else:
+                results = self.fetch_rows(seek_queryset, start - seek_position, stop - seek_position)
+                self.fetch_method = seek_method
+
+        if results is None and is_deep:
+            if boundary_values is None:
+                boundary_position, boundary_values = self.get_boundary(queryset, max_position)
+            if boundary_values is None and max_position > 0:
+                # there are less rows than the limit, so the page is empty anyway
+                self.has_next = False
+                return []
+            raise self.get_deep_pagination_error(boundary_position, boundary_values)
+        if results is None:
+            results = self.fetch_rows(queryset, start, stop)
+
+        if results:
+            self.add_bookmark(queryset, start + len(results), results[-1])
+        return results
+
+    def get_boundary(self, queryset, max_position):
+        """Returns position & ordering values of the last row before the limit of deep pagination"""
+        boundary = list(queryset[max_position - 1:max_position]) if max_position > 0 else []
+        if not boundary:
+            return None, None
+        return max_position, _get_keyset_values(boundary[0], self.ordering)
+
+    def get_deep_pagination_error(self, position, values):
+        if values is None or not self.cursor_query_param:
+            return DeepPaginationError()
+
+        url = self.get_position_link(position)
+        url = replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, values))
+        return DeepPaginationError({"detail": DeepPaginationError.default_detail, "next": url})
+
+    def get_bookmarks_version(self, model):
+        _bookmarks_cache_aliases.add(self.bookmarks_cache_alias)
+        cache = caches[self.bookmarks_cache_alias]
+        version_key = _get_bookmarks_version_key(model)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, uuid.uuid4().hex, None)
+            version = cache.get(version_key)
+        return version
+
+    def get_bookmarks_key(self, queryset):
+        version = getattr(self, "bookmarks_version", None) or self.get_bookmarks_version(queryset.model)
+        return "drf_tweaks:bookmarks:%s:%s" % (version, _get_queryset_signature(queryset))
+
+    def get_bookmark(self, queryset, position):
+        """Returns position & ordering values of the nearest valid bookmark preceding the position"""
+        if not self.bookmarks_cache_alias or position < self.bookmarks_min_offset:
+            return None, None
+
+        cache = caches[self.bookmarks_cache_alias]
+        bookmarks_key = self.get_bookmarks_key(queryset)
+        bookmarks = cache.get(bookmarks_key) or {}
+        positions = [bookmark_position for bookmark_position in bookmarks if bookmark_position <= position]
+        if not positions:
+            return None, None
+
+        bookmark_position = max(positions)
+        pk, values = bookmarks[bookmark_position]
+        names = [item.lstrip("-") for item in self.ordering]
+        if list(queryset.filter(pk=pk).values_list(*names)) != [tuple(values)]:
+            # stale bookmark - row was removed or moved
+            del bookmarks[bookmark_position]
+            cache.set(bookmarks_key, bookmarks, self.bookmarks_timeout)
+            return None, None
+
+        return bookmark_position, dict(zip(names, values))
+
+    def add_bookmark(self, queryset, position, obj):
+        if not self.bookmarks_cache_alias or position < self.bookmarks_min_offset:
+            return
+
+        cache = caches[self.bookmarks_cache_alias]
+        bookmarks_key = self.get_bookmarks_key(queryset)
+        bookmarks = cache.get(bookmarks_key) or {}
+        if position in bookmarks:
+            return
+
+        values = _get_keyset_values(obj, self.ordering)
+        bookmarks[position] = (obj.pk, [values[item.lstrip("-")] for item in self.ordering])
+        while len(bookmarks) > self.bookmarks_max_count:
+            del bookmarks[next(iter(bookmarks))]
+        cache.set(bookmarks_key, bookmarks, self.bookmarks_timeout)
+
+    def get_cursor_values(self, queryset, position):
+        try:
+            encoded_cursor = self.request.query_params[self.cursor_query_param]
+            cursor = json.loads(urlsafe_b64decode(encoded_cursor.encode("ascii")).decode("utf-8"))
+            if cursor["position"] != position or tuple(cursor["ordering"]) != self.ordering:
+                return None
+            if len(cursor["values"]) != len(self.ordering):
+                return None
+            return _get_keyset_fields_values(queryset.model, self.ordering, cursor["values"])
+        except (KeyError, ValueError, TypeError, UnicodeError, binascii.Error, DjangoValidationError):
+            return None
+
+    def encode_cursor(self, position, values):
+        cursor = {
+            "position": position,
+            "ordering": self.ordering,
+            "values": [values[item.lstrip("-")] for item in self.ordering],
+        }
+        return urlsafe_b64encode(json.dumps(cursor, cls=_CursorJSONEncoder).encode("utf-8")).decode("ascii")
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = self.get_next_position()
+        url = self.get_position_link(position)
+        if not self.cursor_query_param:
+            return url
+        if self.ordering is None or not self.results:
+            return remove_query_param(url, self.cursor_query_param)
+
+        cursor = self.encode_cursor(position, _get_keyset_values(self.results[-1], self.ordering))
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        response_data = OrderedDict()
+        if self.count_strategy is not None:
+            response_data['count'] = self.count
+            response_data['count_is_estimate'] = self.count_is_estimate
+        response_data['next'] = self.get_next_link()
+        response_data['previous'] = self.get_previous_link()
+        if response_data['previous'] and self.cursor_query_param:
+            response_data['previous'] = remove_query_param(response_data['previous'], self.cursor_query_param)
+        response_data['results'] = data
+        return Response(response_data)
+
+
+class NoCountsLimitOffsetPagination(NoCountsPaginationMixin, LimitOffsetPagination):
     """
     A limit/offset based pagination, without performing counts. For example:
 
@@ -32,7 +545,14 @@ class NoCountsLimitOffsetPagination(LimitOffsetPagination):
     Cons:
         - skip is a relatively slow operation, so this paginator is not as fast as cursor paginator when you use
           large offsets
+
+    Set deferred_join = True to fetch the page in two steps (primary keys first, then the rows) - see
+    NoCountsPaginationMixin.
+
+    Set max_offset to limit the offsets that are served by skipping rows - see NoCountsPaginationMixin.
     """
+    max_offset = None
+
     def get_html_context(self):
         raise NotImplementedError
 
@@ -50,34 +570,33 @@ class NoCountsLimitOffsetPagination(LimitOffsetPagination):
             raise IncorrectLimitOffsetError
 
         self.request = request
-        self.results = list(queryset[self.offset:self.offset + self.effective_limit])
+        self.evaluate_count(queryset)
+        self.results = self.get_page_results(queryset, self.offset, self.offset + self.effective_limit)
+        _send_pagination_metrics(
+            self, view, offset=self.offset, page_size=self.effective_limit, rows=len(self.results),
+            duration=self.fetch_duration, has_next=self.has_next, method=self.fetch_method
+        )
         return self.results
 
-    def get_paginated_response(self, data):
-        return Response(OrderedDict([
-            ('next', self.get_next_link()),
-            ('previous', self.get_previous_link()),
-            ('results', data)
-        ]))
-
     def get_offset(self, request):
         try:
             return int(request.query_params[self.offset_query_param])
         except (KeyError, ValueError):
             return 0
 
-    def get_next_link(self):
-        if len(self.results) < self.effective_limit:
-            return None
+    def get_max_position(self):
+        return self.max_offset
 
+    def get_next_position(self):
+        return self.offset + self.effective_limit
+
+    def get_position_link(self, position):
         url = self.request.build_absolute_uri()
         url = replace_query_param(url, self.limit_query_param, self.limit)
-
-        offset = self.offset + self.effective_limit
-        return replace_query_param(url, self.offset_query_param, offset)
+        return replace_query_param(url, self.offset_query_param, position)
 
 
-class NoCountsPageNumberPagination(PageNumberPagination):
+class NoCountsPageNumberPagination(NoCountsPaginationMixin, PageNumberPagination):
     """
     A standard page number pagination, without performing counts.
 
@@ -90,7 +609,14 @@ class NoCountsPageNumberPagination(PageNumberPagination):
     Cons:
         - skip is a relatively slow operation, so this paginator is not as fast as cursor paginator when you use
           large page numbers
+
+    Set deferred_join = True to fetch the page in two steps (primary keys first, then the rows) - see
+    NoCountsPaginationMixin.
+
+    Set max_page_number to limit the pages that are served by skipping rows - see NoCountsPaginationMixin.
     """
+    max_page_number = None
+
     def get_page_number(self, request):
         try:
             return int(request.query_params[self.page_query_param])
@@ -111,7 +637,146 @@ class NoCountsPageNumberPagination(PageNumberPagination):
             raise NotFound(self.invalid_page_message)
 
         self.request = request
-        self.results = list(queryset[(self.page_number - 1) * self.page_size:self.page_number * self.page_size])
+        self.evaluate_count(queryset)
+        self.results = self.get_page_results(
+            queryset, (self.page_number - 1) * self.page_size, self.page_number * self.page_size
+        )
+        _send_pagination_metrics(
+            self, view, offset=(self.page_number - 1) * self.page_size, page_size=self.page_size,
+            rows=len(self.results), duration=self.fetch_duration, has_next=self.has_next, method=self.fetch_method
+        )
+        return self.results
+
+    def get_max_position(self):
+        if self.max_page_number is None:
+            return None
+        return (self.max_page_number - 1) * self.page_size
+
+    def get_next_position(self):
+        return self.page_number * self.page_size
+
+    def get_position_link(self, position):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.page_query_param, position // self.page_size + 1)
+
+    def get_previous_link(self):
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        previous_page_number = self.page_number - 1
+        if previous_page_number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, previous_page_number)
+
+
+class AnchorWindowPagination(BasePagination):
+    """
+    A keyset based pagination, returning a window of items around the anchor item, without performing counts.
+    For example:
+
+    http://api.example.org/accounts/?after=20 - will return first 20 items
+    http://api.example.org/accounts/?anchor=123&after=20 - will return 20 items following the item with id 123
+    http://api.example.org/accounts/?anchor=123&before=10&after=10 - will return 10 items preceding and 10 items
+    following the item with id 123 (the anchor item itself is included only if include_anchor is set)
+
+    Both sides of the window are fetched with indexed range queries (WHERE (ordering) > (anchor values)), so scrolling
+    does not get slower the further the user scrolls. The "next" and "previous" links point to the last & first item
+    of the window respectively.
+
+    HTML is not handled (no get_html_context).
+
+    Pros:
+        - no counts
+        - constant time, regardless of the scroll position
+        - works with angular ui-scroll (fetching items before & after a given one)
+        - works with sorting by non-nullable, non-relational fields
+
+    Cons:
+        - pagination is based on item ids, not positions - so it is not possible to jump to a given page
+    """
+    anchor_query_param = "anchor"
+    before_query_param = "before"
+    after_query_param = "after"
+    default_limit = api_settings.PAGE_SIZE
+    max_limit = None
+    include_anchor = False
+
+    def get_html_context(self):
+        raise NotImplementedError
+
+    def get_window_size(self, request, query_param, default):
+        try:
+            size = int(request.query_params[query_param])
+        except KeyError:
+            return default
+        except ValueError:
+            raise IncorrectAnchorError
+
+        if size < 0:
+            raise IncorrectAnchorError
+        if self.max_limit:
+            return min(size, self.max_limit)
+        return size
+
+    def get_anchor_object(self, queryset, request):
+        anchor = request.query_params.get(self.anchor_query_param)
+        if anchor is None:
+            return None
+
+        try:
+            anchor_object = queryset.filter(pk=anchor).first()
+        except (ValueError, DjangoValidationError):
+            raise IncorrectAnchorError
+        if anchor_object is None:
+            raise NotFound(_("Anchor item does not exist."))
+        return anchor_object
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = _get_keyset_ordering(queryset)
+        if self.ordering is None:
+            raise IncorrectAnchorError(_("Ordering of this list cannot be used with anchor pagination."))
+        queryset = _order_by_keyset(queryset, self.ordering)
+
+        self.request = request
+        self.anchor_object = self.get_anchor_object(queryset, request)
+        self.before = self.get_window_size(request, self.before_query_param, 0)
+        self.after = self.get_window_size(request, self.after_query_param, self.default_limit or 0)
+        if self.anchor_object is None:
+            self.before = 0
+        if not self.before and not self.after:
+            raise IncorrectAnchorError
+
+        # one extra item is fetched on each side, to know if there is anything more
+        started_at = time.perf_counter()
+        self.before_results = []
+        self.after_results = []
+        if self.anchor_object is None:
+            self.after_results = list(queryset[:self.after + 1])
+        else:
+            anchor_values = _get_keyset_values(self.anchor_object, self.ordering)
+            if self.before:
+                before_queryset = queryset.filter(_get_keyset_filter(self.ordering, anchor_values, reverse=True))
+                self.before_results = list(before_queryset.order_by(*_reverse_ordering(self.ordering))[
+                    :self.before + 1])
+            if self.after:
+                after_queryset = queryset.filter(_get_keyset_filter(self.ordering, anchor_values))
+                self.after_results = list(after_queryset[:self.after + 1])
+        duration = time.perf_counter() - started_at
+
+        self.has_previous = len(self.before_results) > self.before or (
+            self.anchor_object is not None and not self.before)
+        self.has_next = len(self.after_results) > self.after or (self.anchor_object is not None and not self.after)
+        self.before_results = self.before_results[:self.before][::-1]
+        self.after_results = self.after_results[:self.after]
+
+        self.results = list(self.before_results)
+        if self.anchor_object is not None and self.include_anchor:
+            self.results.append(self.anchor_object)
+        self.results.extend(self.after_results)
+        _send_pagination_metrics(
+            self, view, offset=None, page_size=self.before + self.after, rows=len(self.results), duration=duration,
+            has_next=self.has_next, method="anchor"
+        )
         return self.results
 
     def get_paginated_response(self, data):
@@ -122,17 +787,21 @@ class NoCountsPageNumberPagination(PageNumberPagination):
         ]))
 
     def get_next_link(self):
-        if len(self.results) < self.page_size:
+        if not self.has_next:
             return None
+
+        anchor = self.after_results[-1] if self.after_results else self.anchor_object
         url = self.request.build_absolute_uri()
-        next_page_number = self.page_number + 1
-        return replace_query_param(url, self.page_query_param, next_page_number)
+        url = replace_query_param(url, self.anchor_query_param, anchor.pk)
+        url = remove_query_param(url, self.before_query_param)
+        return replace_query_param(url, self.after_query_param, self.after or self.before)
 
     def get_previous_link(self):
-        if self.page_number == 1:
+        if not self.has_previous:
             return None
+
+        anchor = self.before_results[0] if self.before_results else self.anchor_object
         url = self.request.build_absolute_uri()
-        previous_page_number = self.page_number - 1
-        if previous_page_number == 1:
-            return remove_query_param(url, self.page_query_param)
-        return replace_query_param(url, self.page_query_param, previous_page_number)
+        url = replace_query_param(url, self.anchor_query_param, anchor.pk)
+        url = replace_query_param(url, self.before_query_param, self.before or self.after)
+        return replace_query_param(url, self.after_query_param, 0)
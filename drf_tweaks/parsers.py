@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import codecs
+import json
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+WHITESPACE = " \t\n\r"
+
+
+class JSONArrayStream(object):
+    """
+    Lazy iterator over items of a JSON array, decoded incrementally from the stream - only the current item (and
+    a buffer of read_size characters) is held in memory. Can be iterated only once.
+    """
+
+    def __init__(self, stream, encoding="utf-8", read_size=64 * 1024, buffer=""):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.json_decoder = json.JSONDecoder()
+        self.read_size = read_size
+        self.buffer = buffer
+        self.position = 0
+        self.eof = False
+
+    def read(self):
+        if self.eof:
+            return False
+        data = self.stream.read(self.read_size)
+        if not data:
+            self.eof = True
+            self.buffer = self.buffer[self.position:] + self.decoder.decode(b"", final=True)
+        else:
+            self.buffer = self.buffer[self.position:] + self.decoder.decode(data)
+        self.position = 0
+        return True
+
+    def next_char(self):
+        """Returns the next non-whitespace character (without consuming it), None at the end of the stream"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read():
+                return None
+
+    def expect(self, chars):
+        char = self.next_char()
+        if char is None or char not in chars:
+            raise ParseError(f"JSON parse error - expected one of '{chars}' at position {self.position}")
+        self.position += 1
+        return char
+
+    def decode_item(self):
+        while True:
+            try:
+                item, end = self.json_decoder.raw_decode(self.buffer, self.position)
+                # numbers & literals at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return item
+            except ValueError as exc:
+                if self.eof:
+                    raise ParseError(f"JSON parse error - {exc}")
+            self.read()
+
+    def __iter__(self):
+        self.expect("[")
+        if self.next_char() == "]":
+            self.position += 1
+        else:
+            while True:
+                self.next_char()
+                yield self.decode_item()
+                if self.expect(",]") == "]":
+                    break
+
+        if self.next_char() is not None:
+            raise ParseError("JSON parse error - extra data after the array")
+
+
+class StreamingJSONArrayParser(BaseParser):
+    """
+    Parses JSON arrays lazily - request.data is a JSONArrayStream, which decodes items while iterating over it.
+    Other JSON values are parsed as usual.
+    """
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        data = JSONArrayStream(stream, encoding)
+        if data.next_char() == "[":
+            return data
+
+        while data.read():
+            pass
+        try:
+            return json.loads(data.buffer)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
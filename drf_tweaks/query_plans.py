@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+""" Verification of query plans of filtering & ordering exposed by autofilter-decorated views
+
+    For every filter field & lookup and every ordering of the view representative queries are built and explained
+    (EXPLAIN / EXPLAIN QUERY PLAN). Filtering queries using full table (or full index) scans and ordering queries
+    sorting the rows (filesort) are reported as problems.
+
+    On PostgreSQL sequential scans & sorts are disabled for the EXPLAIN (enable_seqscan & enable_sort), so the planner
+    uses an index whenever it can - "Seq Scan" or "Sort" in the plan means that no index can serve the query, regardless
+    of the size of the table. On other databases the plan depends on the data & statistics, so the check should be run
+    against a database with a representative amount of data.
+"""
+import datetime
+import re
+import uuid
+from django.core.exceptions import FieldDoesNotExist, FieldError
+from django.db import connections, models, transaction
+from django.urls import get_resolver, URLPattern, URLResolver
+
+# (vendor, problem) -> pattern found in the plan
+PLAN_PROBLEMS = {
+    "sqlite": {
+        "full scan": re.compile(r"\bSCAN\b"),
+        "filesort": re.compile(r"USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY"),
+    },
+    "postgresql": {
+        "full scan": re.compile(r"\bSeq Scan\b"),
+        "filesort": re.compile(r"(^|->\s+)(Incremental )?Sort\b", re.MULTILINE),
+    },
+    "mysql": {
+        "full scan": re.compile(r"\bALL\b"),
+        "filesort": re.compile(r"Using filesort"),
+    },
+}
+
+
+class QueryPlanCheck(object):
+    def __init__(self, view_class, description, queryset, ordering=False):
+        self.view_class = view_class
+        self.description = description
+        self.queryset = queryset
+        self.ordering = ordering
+        self.plan = None
+        self.problems = []
+
+    def __str__(self):
+        status = ", ".join(self.problems).upper() if self.problems else "OK"
+        return f"{self.view_class.__module__}.{self.view_class.__name__} {self.description}: {status}"
+
+
+def explain(queryset):
+    """Plan of the queryset - on PostgreSQL with sequential scans & sorts disabled"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.explain()
+
+    with transaction.atomic(using=queryset.db):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+        return queryset.explain()
+
+
+def get_plan_problems(plan, vendor, ordering=False):
+    """Problems found in the plan: "full scan" for filtering queries, "filesort" for ordering queries"""
+    patterns = PLAN_PROBLEMS.get(vendor, {})
+    problem = "filesort" if ordering else "full scan"
+    if problem in patterns and patterns[problem].search(plan):
+        return [problem]
+    return []
+
+
+def get_representative_value(queryset, field):
+    """Value present in the database, or some valid value of the field's type"""
+    value = field.model._default_manager.using(queryset.db).exclude(
+        **{f"{field.attname}__isnull": True}
+    ).values_list(field.attname, flat=True).first()
+    if value is not None:
+        return value
+
+    if field.is_relation:
+        field = field.target_field
+    if isinstance(field, models.BooleanField):
+        return True
+    if isinstance(field, models.DateTimeField):
+        return datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    if isinstance(field, models.DateField):
+        return datetime.date(2000, 1, 1)
+    if isinstance(field, models.TimeField):
+        return datetime.time(12)
+    if isinstance(field, models.UUIDField):
+        return uuid.UUID(int=1)
+    if isinstance(field, (models.IntegerField, models.AutoField, models.FloatField, models.DecimalField)):
+        return 1
+    return "a"
+
+
+def get_lookup_value(lookup, value):
+    if lookup in ("in", "range"):
+        return [value, value]
+    if lookup == "isnull":
+        return True
+    if lookup in ("contains", "icontains", "startswith", "istartswith", "endswith", "iendswith", "search"):
+        return str(value)[:3] or "a"
+    return value
+
+
+def get_view_filters(view_class):
+    filter_class = getattr(view_class, "filter_class", None)
+    if filter_class is not None:
+        filters = filter_class.Meta.fields
+    else:
+        filters = getattr(view_class, "filter_fields", None) or {}
+    if not isinstance(filters, dict):
+        filters = {key: ["exact"] for key in filters}
+    return filters
+
+
+def get_field(model, path):
+    """Model field for the field name or the path across relations (e.g. "fk__name")"""
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+        if model is None:
+            raise FieldDoesNotExist(path)
+    return model._meta.get_field(name)
+
+
+def get_view_queryset(view_class):
+    if getattr(view_class, "queryset", None) is not None:
+        return view_class.queryset.all()
+    return view_class().get_serializer_class().Meta.model._default_manager.all()
+
+
+def get_checks(view_class):
+    """Representative filtering & ordering queries for the view"""
+    queryset = get_view_queryset(view_class)
+    model = queryset.model
+    checks = []
+    for field_name, lookups in sorted(get_view_filters(view_class).items()):
+        try:
+            field = get_field(model, field_name)
+        except FieldDoesNotExist:
+            continue
+        value = get_representative_value(queryset, field)
+        for lookup in lookups:
+            checks.append(QueryPlanCheck(
+                view_class,
+                f"?{field_name}__{lookup}" if lookup != "exact" else f"?{field_name}",
+                queryset.filter(**{f"{field_name}__{lookup}": get_lookup_value(lookup, value)}).order_by(),
+            ))
+
+    orderings = getattr(view_class, "ordering_sequences", None) or [
+        (field_name, ) for field_name in sorted(getattr(view_class, "ordering_fields", None) or [])
+    ]
+    for ordering in orderings:
+        reversed_ordering = tuple(field[1:] if field.startswith("-") else f"-{field}" for field in ordering)
+        for fields in (ordering, reversed_ordering):
+            try:
+                ordered_queryset = queryset.order_by(*fields)
+                str(ordered_queryset.query)
+            except (FieldDoesNotExist, FieldError):
+                continue
+            checks.append(QueryPlanCheck(view_class, f"?ordering={','.join(fields)}", ordered_queryset, ordering=True))
+    return checks
+
+
+def run_checks(view_class):
+    checks = get_checks(view_class)
+    for check in checks:
+        check.plan = explain(check.queryset)
+        check.problems = get_plan_problems(check.plan, connections[check.queryset.db].vendor, check.ordering)
+    return checks
+
+
+def get_autofilter_views(urlconf=None):
+    """View classes decorated with autofilter, found in the urlconf"""
+    views = []
+
+    def collect(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                collect(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern):
+                view_class = getattr(pattern.callback, "view_class", None) or getattr(pattern.callback, "cls", None)
+                if getattr(view_class, "_autofiltered", False) and view_class not in views:
+                    views.append(view_class)
+
+    collect(get_resolver(urlconf).url_patterns)
+    return views
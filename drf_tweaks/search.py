@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+""" Full text search of autofilter-decorated views
+
+    Text fields selected with autofilter(search=(...)) are indexed in a side table "<model's table>_search", kept in
+    sync by post_save & post_delete signals of the model:
+    - SQLite: FTS5 virtual table with a column per field, rows identified by rowid (integer primary keys only),
+    - PostgreSQL: table with a tsvector document (fields weighted A, B, C, D in their order) and a GIN index on it.
+    Queries use the full text index, so their cost does not grow with a LIKE scan of the whole table. Results are
+    annotated with search_rank (higher is better) and ordered by it, unless ordering is requested explicitly. On other
+    databases search falls back to icontains on the fields.
+
+    Missing tables are created (and filled) after migrate (post_migrate). The rebuild_search_index management command
+    recreates them - it should be run after changes bypassing signals (bulk_create, QuerySet.update etc.). Failures of
+    the signals (e.g. missing table) are logged & do not break saving of the model.
+"""
+import logging
+import re
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, DatabaseError, models, router, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.urls import get_resolver
+from functools import reduce
+from operator import or_
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+POSTGRESQL_WEIGHTS = ("A", "B", "C", "D")
+
+_search_indexes = {}
+
+
+def get_search_tokens(query):
+    """Words of the query - any full text search syntax is stripped, so users' input is always a valid query"""
+    return TOKEN_PATTERN.findall(query)
+
+
+class SearchIndex(object):
+    chunk_size = 1000
+
+    def __init__(self, model, fields, config="simple"):
+        self.model = model
+        self.fields = tuple(fields)
+        self.config = config
+        self.table = f"{model._meta.db_table}_search"
+        self.integer_pk = isinstance(model._meta.pk, (models.AutoField, models.IntegerField))
+        for name in self.fields:
+            field = model._meta.get_field(name)
+            if not isinstance(field, (models.CharField, models.TextField)):
+                raise ImproperlyConfigured(f"Full text search field {model.__name__}.{name} is not a text field.")
+        if not self.integer_pk and self.get_connection().vendor == "sqlite":
+            raise ImproperlyConfigured(
+                f"Full text search of {model.__name__} on SQLite requires an integer primary key."
+            )
+
+    def get_connection(self, using=None):
+        return connections[using or router.db_for_write(self.model)]
+
+    def is_supported(self, connection):
+        if connection.vendor == "sqlite":
+            return self.integer_pk
+        return connection.vendor == "postgresql"
+
+    def get_values(self, obj):
+        return [getattr(obj, name) or "" for name in self.fields]
+
+    # schema
+    def create(self, using=None):
+        connection = self.get_connection(using)
+        if not self.is_supported(connection):
+            return
+        table = connection.ops.quote_name(self.table)
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                columns = ", ".join(connection.ops.quote_name(name) for name in self.fields)
+                cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5({columns})")
+            else:
+                pk_type = self.model._meta.pk.rel_db_type(connection)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} (object_id {pk_type} PRIMARY KEY, document tsvector NOT NULL)"
+                )
+                index = connection.ops.quote_name(f"{self.table}_document")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin(document)")
+
+    def drop(self, using=None):
+        connection = self.get_connection(using)
+        if not self.is_supported(connection):
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {connection.ops.quote_name(self.table)}")
+
+    def rebuild(self, using=None):
+        """Recreates the table and indexes all the objects"""
+        self.drop(using)
+        self.create(using)
+        connection = self.get_connection(using)
+        chunk = []
+        queryset = self.model._default_manager.using(connection.alias).only("pk", *self.fields)
+        for obj in queryset.iterator(chunk_size=self.chunk_size):
+            chunk.append(obj)
+            if len(chunk) == self.chunk_size:
+                self.update(chunk, using)
+                chunk = []
+        if chunk:
+            self.update(chunk, using)
+
+    # data
+    def update(self, objects, using=None):
+        connection = self.get_connection(using)
+        if not objects or not self.is_supported(connection):
+            return
+        table = connection.ops.quote_name(self.table)
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                columns = ", ".join(connection.ops.quote_name(name) for name in self.fields)
+                placeholders = ", ".join(["%s"] * len(self.fields))
+                cursor.executemany(f"DELETE FROM {table} WHERE rowid = %s", [(obj.pk, ) for obj in objects])
+                cursor.executemany(
+                    f"INSERT INTO {table} (rowid, {columns}) VALUES (%s, {placeholders})",
+                    [[obj.pk] + self.get_values(obj) for obj in objects]
+                )
+            else:
+                document = " || ".join(
+                    f"setweight(to_tsvector(%s::regconfig, %s), '{POSTGRESQL_WEIGHTS[min(position, 3)]}')"
+                    for position in range(len(self.fields))
+                )
+                cursor.executemany(
+                    f"INSERT INTO {table} (object_id, document) VALUES (%s, {document}) "
+                    f"ON CONFLICT (object_id) DO UPDATE SET document = EXCLUDED.document",
+                    [
+                        [obj.pk] + [item for value in self.get_values(obj) for item in (self.config, value)]
+                        for obj in objects
+                    ]
+                )
+
+    def delete(self, pks, using=None):
+        connection = self.get_connection(using)
+        if not pks or not self.is_supported(connection):
+            return
+        table = connection.ops.quote_name(self.table)
+        column = "rowid" if connection.vendor == "sqlite" else "object_id"
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {table} WHERE {column} = %s", [(pk, ) for pk in pks])
+
+    # queries
+    def search(self, queryset, query, order_by_rank=True):
+        """Queryset filtered by the full text query & annotated with search_rank"""
+        tokens = get_search_tokens(query)
+        if not tokens:
+            return queryset
+
+        connection = connections[queryset.db]
+        if not self.is_supported(connection):
+            # all the words, each in any of the fields
+            for token in tokens:
+                queryset = queryset.filter(reduce(or_, [Q(**{f"{name}__icontains": token}) for name in self.fields]))
+            return queryset
+
+        table = connection.ops.quote_name(self.table)
+        pk_column = f"{connection.ops.quote_name(self.model._meta.db_table)}." \
+                    f"{connection.ops.quote_name(self.model._meta.pk.column)}"
+        # all the words, the last one as a prefix (search as you type)
+        if connection.vendor == "sqlite":
+            match = " ".join('"%s"' % token for token in tokens) + "*"
+            queryset = queryset.extra(
+                tables=[self.table], select={"search_rank": f"-{table}.rank"},
+                where=[f"{table}.rowid = {pk_column}", f"{table} MATCH %s"], params=[match],
+            )
+        else:
+            match = " & ".join(tokens) + ":*"
+            queryset = queryset.extra(
+                tables=[self.table],
+                select={"search_rank": f"ts_rank({table}.document, to_tsquery(%s::regconfig, %s))"},
+                select_params=[self.config, match],
+                where=[f"{table}.object_id = {pk_column}", f"{table}.document @@ to_tsquery(%s::regconfig, %s)"],
+                params=[self.config, match],
+            )
+        if order_by_rank:
+            queryset = queryset.order_by("-search_rank", "-pk")
+        return queryset
+
+
+def _sync_search_index(method, objects, using):
+    # in a savepoint, so a failure does not abort the transaction of the save (PostgreSQL)
+    try:
+        with transaction.atomic(using=using):
+            method(objects, using)
+    except DatabaseError:
+        logger.exception("Full text search index %s could not be updated.", method.__self__.table)
+
+
+def _update_search_index(sender, instance, using, **kwargs):
+    _sync_search_index(_search_indexes[sender].update, [instance], using)
+
+
+def _delete_from_search_index(sender, instance, using, **kwargs):
+    _sync_search_index(_search_indexes[sender].delete, [instance.pk], using)
+
+
+def _create_search_indexes(sender, app_config, using, **kwargs):
+    """post_migrate: creates & fills missing tables of the app's search indexes"""
+    if getattr(settings, "ROOT_URLCONF", None):
+        # search indexes are registered by views' decorators
+        get_resolver().url_patterns
+
+    connection = connections[using]
+    table_names = None
+    for search_index in get_search_indexes():
+        model = search_index.model
+        if model._meta.app_config is not app_config or not router.allow_migrate_model(using, model):
+            continue
+        if not search_index.is_supported(connection):
+            continue
+        if table_names is None:
+            table_names = connection.introspection.table_names()
+        if search_index.table not in table_names:
+            search_index.rebuild(using)
+
+
+post_migrate.connect(_create_search_indexes, dispatch_uid="drf_tweaks_search_post_migrate")
+
+
+def register_search_index(model, fields, config="simple"):
+    """Search index of the model, kept in sync with model's signals - one per model"""
+    if model in _search_indexes:
+        search_index = _search_indexes[model]
+        if search_index.fields != tuple(fields) or search_index.config != config:
+            raise ImproperlyConfigured(
+                f"Full text search of {model.__name__} is already registered for fields {search_index.fields}."
+            )
+        return search_index
+
+    search_index = _search_indexes[model] = SearchIndex(model, fields, config)
+    post_save.connect(_update_search_index, sender=model, dispatch_uid=f"drf_tweaks_search_{model._meta.label}")
+    post_delete.connect(_delete_from_search_index, sender=model, dispatch_uid=f"drf_tweaks_search_{model._meta.label}")
+    return search_index
+
+
+def get_search_indexes():
+    return list(_search_indexes.values())
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """Filters by ?search=... using view's search_index (set by autofilter), ranked unless ?ordering is given"""
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        search_index = getattr(view, "search_index", None)
+        query = request.query_params.get(self.search_param, "")
+        if search_index is None or not query:
+            return queryset
+        return search_index.search(
+            queryset, query, order_by_rank=not request.query_params.get(api_settings.ORDERING_PARAM)
+        )
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from django.db import models
+from django.utils import timezone
 
 
 class SampleModel(models.Model):
@@ -32,6 +33,50 @@ class SampleModelForAutofilter(models.Model):
         return "property"
 
 
+class SampleModelWithIndexes(models.Model):
+    a = models.IntegerField()
+    b = models.IntegerField()
+    c = models.CharField(max_length=255)
+    d = models.IntegerField()
+    e = models.IntegerField()
+    f = models.CharField(max_length=255)
+    g = models.IntegerField()
+    h = models.IntegerField()
+    non_indexed = models.IntegerField()
+
+    class Meta:
+        index_together = [("a", "b")]
+        unique_together = [("d", "e")]
+        indexes = [
+            models.Index(fields=["c", "-a"], name="sample_c_a_idx"),
+            models.Index(fields=["g"], name="sample_g_partial_idx", condition=models.Q(g__gt=0)),
+        ]
+        constraints = [models.UniqueConstraint(fields=["f", "b"], name="sample_f_b_unique")]
+
+
+class SampleRelatedModelWithIndexes(models.Model):
+    name = models.CharField(max_length=255, db_index=True)
+    non_indexed = models.CharField(max_length=255)
+    parent = models.ForeignKey(SampleModelWithIndexes, on_delete=models.CASCADE)
+    non_indexed_parent = models.ForeignKey(
+        SampleModelWithIndexes, db_index=False, related_name="+", on_delete=models.CASCADE
+    )
+
+
+class SampleModelWithRelatedIndexes(models.Model):
+    related = models.ForeignKey(SampleRelatedModelWithIndexes, on_delete=models.CASCADE)
+    non_indexed_related = models.ForeignKey(
+        SampleRelatedModelWithIndexes, db_index=False, related_name="+", on_delete=models.CASCADE
+    )
+    one = models.OneToOneField(SampleModel, null=True, on_delete=models.CASCADE)
+
+
+class SampleSearchModel(models.Model):
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    position = models.IntegerField(default=0)
+
+
 class ThirdLevelModelForNestedFilteringTest(models.Model):
     name = models.CharField(max_length=255)
 
@@ -63,3 +108,9 @@ class AutoOptimization1Model(models.Model):
     name = models.CharField(max_length=255)
     fk_2 = models.ForeignKey(AutoOptimization2Model, related_name="reverse_1", on_delete=models.CASCADE)
     sample_m2m = models.ManyToManyField(SampleModel)
+
+
+class SampleModelForPagination(models.Model):
+    value = models.IntegerField(db_index=True)
+    name = models.CharField(max_length=255, blank=True)
+    created = models.DateTimeField(default=timezone.now)
@@ -1,20 +1,48 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
-from django.test import TestCase
+import json
+import threading
+from unittest import mock
+
+from django.contrib.postgres.indexes import GinIndex, HashIndex
+from django.contrib.auth.models import User
+from django.db import connection, models
+from django.db.models import Q
+from django.test import Client, TestCase
 from django.test import override_settings
 from django.urls import re_path
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters.rest_framework import FilterSet
 from rest_framework import filters
 from rest_framework.generics import ListAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.reverse import reverse
 
 from drf_tweaks import serializers
-from drf_tweaks.autofilter import autofilter
+from drf_tweaks.mixins import FilterSearchMixin
+from drf_tweaks.autofilter import (
+    AutofilterIndex, autofilter, CompactInFilter, CompactInFilterBackend, get_model_indexes, get_related_index_paths,
+    IndexLookupPolicy, IndexOrderingFilter, LookupPolicy, resolve_autofilters
+)
 from tests.models import SampleModel
 from tests.models import SampleModelForAutofilter
+from tests.models import SampleModelWithIndexes
+from tests.models import SampleModelWithRelatedIndexes
+from tests.models import SampleRelatedModelWithIndexes
+
+
+class SampleUnmanagedModelWithIndexes(models.Model):
+    a = models.CharField(max_length=255)
+    b = models.IntegerField()
+
+    class Meta:
+        managed = False
+        indexes = [
+            GinIndex(fields=["a"], name="sample_a_trgm_idx", opclasses=["gin_trgm_ops"]),
+            HashIndex(fields=["b"], name="sample_b_hash_idx"),
+        ]
 
 
 class SampleModelForAutofilterSerializerVer1(serializers.ModelSerializer):
@@ -91,9 +119,77 @@ class SampleApiV6(ListAPIView):
     filter_class = SampleFilterClassV2
 
 
+class SampleModelWithIndexesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SampleModelWithIndexes
+        fields = ["id", "a", "b", "c", "d", "e", "f", "g", "h", "non_indexed"]
+
+
+@autofilter(index_ordering=True)
+class SampleApiWithIndexes(ListAPIView):
+    permission_classes = (AllowAny,)
+    serializer_class = SampleModelWithIndexesSerializer
+    queryset = SampleModelWithIndexes.objects.all()
+
+
+class SampleParentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SampleModelWithIndexes
+        fields = ["id", "c", "d"]
+
+
+class SampleRelatedModelWithIndexesSerializer(serializers.ModelSerializer):
+    parent = SampleParentSerializer()
+
+    class Meta:
+        model = SampleRelatedModelWithIndexes
+        fields = ["id", "name", "parent"]
+
+
+class SampleModelWithRelatedIndexesSerializer(serializers.ModelSerializer):
+    related = SampleRelatedModelWithIndexesSerializer()
+
+    class Meta:
+        model = SampleModelWithRelatedIndexes
+        fields = ["id", "related", "non_indexed_related", "one"]
+
+
+class SampleModelWithRelatedIdsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SampleModelWithRelatedIndexes
+        fields = ["id", "related", "non_indexed_related", "one"]
+
+
+@autofilter(related_depth=2)
+class SampleApiWithRelatedIndexes(ListAPIView):
+    permission_classes = (AllowAny,)
+    serializer_class = SampleModelWithRelatedIndexesSerializer
+    queryset = SampleModelWithRelatedIndexes.objects.all()
+
+
+@autofilter(compact_in=True)
+class SampleApiWithCompactIn(FilterSearchMixin, ListAPIView):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    serializer_class = SampleModelWithIndexesSerializer
+    queryset = SampleModelWithIndexes.objects.all()
+
+
+@autofilter(compact_in=True)
+class SampleApiWithRelatedCompactIn(ListAPIView):
+    permission_classes = (AllowAny,)
+    serializer_class = SampleModelWithRelatedIndexesSerializer
+    queryset = SampleModelWithRelatedIndexes.objects.all()
+
+
 urlpatterns = [
     re_path(r"^autofilter/$", SampleApiV1.as_view(), name="autofilter_test"),
     re_path(r"^autofilter-with-class/$", SampleApiV1.as_view(), name="autofilter_with_class_test"),
+    re_path(r"^autofilter-with-indexes/$", SampleApiWithIndexes.as_view(), name="autofilter_with_indexes_test"),
+    re_path(r"^autofilter-with-related-indexes/$", SampleApiWithRelatedIndexes.as_view(),
+            name="autofilter_with_related_indexes_test"),
+    re_path(r"^autofilter-with-compact-in/$", SampleApiWithCompactIn.as_view(), name="autofilter_with_compact_in_test"),
+    re_path(r"^autofilter-with-related-compact-in/$", SampleApiWithRelatedCompactIn.as_view(),
+            name="autofilter_with_related_compact_in_test"),
 ]
 
 
@@ -274,3 +370,354 @@ class TestAutoFilter(TestCase):
         response = self.client.get(reverse("autofilter_with_class_test"), data={"ordering": '-indexed_int'})
         self.assertEqual(response.status_code, 200)
         self.assertGreater(response.data[0]["id"], response.data[1]["id"])
+
+
+@override_settings(ROOT_URLCONF="tests.test_autofilter")
+class TestIndexAwareAutoFilter(TestCase):
+    def test_model_indexes(self):
+        self.assertEqual(get_model_indexes(SampleModelWithIndexes), [
+            AutofilterIndex(("id", ), "btree", None),
+            AutofilterIndex(("a", "b"), "btree", None),
+            AutofilterIndex(("d", "e"), "btree", None),
+            AutofilterIndex(("c", "-a"), "btree", None),
+            AutofilterIndex(("f", "b"), "btree", None),
+        ])
+        self.assertEqual(get_model_indexes(SampleUnmanagedModelWithIndexes), [
+            AutofilterIndex(("id", ), "btree", None),
+            AutofilterIndex(("a", ), "trigram", None),
+            AutofilterIndex(("b", ), "hash", None),
+        ])
+
+    def test_introspected_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE INDEX sample_h_idx ON {SampleModelWithIndexes._meta.db_table} (h DESC)")
+        indexes = get_model_indexes(SampleModelWithIndexes, introspect=True)
+        self.assertIn(AutofilterIndex(("-h", ), "btree", None), indexes)
+
+        @autofilter(introspect_db=True)
+        class SampleApi(ListAPIView):
+            serializer_class = SampleModelWithIndexesSerializer
+            queryset = SampleModelWithIndexes.objects.all()
+
+        self.assertIn("h", SampleApi.filter_fields)
+
+    def test_leading_index_fields(self):
+        # leading fields of indexes - partial index (g) and non-leading fields (b, e) are skipped
+        self.assertEqual(set(SampleApiWithIndexes.filter_fields.keys()), {"id", "a", "c", "d", "f"})
+        self.assertIn(IndexOrderingFilter, SampleApiWithIndexes.filter_backends)
+        self.assertNotIn(filters.OrderingFilter, SampleApiWithIndexes.filter_backends)
+        self.assertEqual(set(SampleApiWithIndexes.ordering_fields), {"id", "a", "b", "c", "d", "e", "f"})
+
+    def test_composite_index_ordering(self):
+        view = SampleApiWithIndexes()
+        ordering_filter = IndexOrderingFilter()
+
+        def get_ordering(ordering):
+            return ordering_filter.remove_invalid_fields(
+                SampleModelWithIndexes.objects.all(), ordering.split(","), view, None
+            )
+
+        self.assertEqual(get_ordering("a,b"), ["a", "b"])
+        self.assertEqual(get_ordering("-a,-b"), ["-a", "-b"])
+        self.assertEqual(get_ordering("a,-b"), ["a"])
+        self.assertEqual(get_ordering("c,-a"), ["c", "-a"])
+        self.assertEqual(get_ordering("-c,a"), ["-c", "a"])
+        self.assertEqual(get_ordering("c,a"), ["c"])
+        self.assertEqual(get_ordering("b"), [])
+        self.assertEqual(get_ordering("b,a"), [])
+        self.assertEqual(get_ordering("id"), ["id"])
+
+    def test_integration_composite_index_ordering(self):
+        for a, b in [(1, 2), (2, 1), (1, 1)]:
+            SampleModelWithIndexes.objects.create(a=a, b=b, c="c", d=a, e=b, f=str(a), g=1, h=1, non_indexed=1)
+        response = self.client.get(reverse("autofilter_with_indexes_test"), data={"ordering": "-a,-b"})
+        self.assertEqual([(item["a"], item["b"]) for item in response.data], [(2, 1), (1, 2), (1, 1)])
+
+
+class TestIndexLookupPolicy(TestCase):
+    def get_lookups(self, model, field_name, vendor):
+        indexes = [index for index in get_model_indexes(model) if index.fields[0].lstrip("-") == field_name]
+        return IndexLookupPolicy().get_lookups(model._meta.get_field(field_name), indexes, vendor)
+
+    def test_btree_lookups(self):
+        self.assertEqual(self.get_lookups(SampleModelWithIndexes, "a", "sqlite"),
+                         ["exact", "in", "isnull", "gt", "gte", "lt", "lte"])
+        # prefix LIKE can use b-tree indexes on PostgreSQL & MySQL only
+        self.assertEqual(self.get_lookups(SampleModelWithIndexes, "c", "sqlite"),
+                         ["exact", "in", "isnull", "gt", "gte", "lt", "lte"])
+        self.assertEqual(self.get_lookups(SampleModelWithIndexes, "c", "postgresql"),
+                         ["exact", "in", "isnull", "gt", "gte", "lt", "lte", "startswith"])
+
+    def test_other_index_lookups(self):
+        self.assertEqual(self.get_lookups(SampleUnmanagedModelWithIndexes, "a", "postgresql"),
+                         ["icontains", "istartswith", "contains"])
+        self.assertEqual(self.get_lookups(SampleUnmanagedModelWithIndexes, "b", "postgresql"), ["exact", "in"])
+
+    def test_not_orderable_and_functional(self):
+        field = models.BooleanField()
+        self.assertEqual(IndexLookupPolicy().get_lookups(field, [AutofilterIndex(("x", ), "btree", None)], "sqlite"),
+                         ["exact", "in", "isnull"])
+        field = models.CharField()
+        self.assertEqual(
+            IndexLookupPolicy().get_lookups(field, [AutofilterIndex(("x", ), "btree", "upper")], "postgresql"),
+            ["iexact"]
+        )
+        # not indexed (explicitly added) fields get default lookups
+        self.assertEqual(IndexLookupPolicy().get_lookups(field, [], "sqlite"),
+                         LookupPolicy().get_lookups(field, [], "sqlite"))
+
+    def test_view_policy(self):
+        @autofilter(lookup_policy=IndexLookupPolicy(), extra_filter=("non_indexed", ))
+        class SampleApi(ListAPIView):
+            serializer_class = SampleModelWithIndexesSerializer
+            queryset = SampleModelWithIndexes.objects.all()
+
+        self.assertEqual(SampleApi.filter_fields["c"], ["exact", "in", "isnull", "gt", "gte", "lt", "lte"])
+        self.assertEqual(SampleApi.filter_fields["non_indexed"], LookupPolicy.comparison_lookups)
+
+        @autofilter()
+        class SampleApiWithAttribute(ListAPIView):
+            serializer_class = SampleModelWithIndexesSerializer
+            queryset = SampleModelWithIndexes.objects.all()
+            autofilter_lookup_policy = IndexLookupPolicy()
+
+        self.assertNotIn("icontains", SampleApiWithAttribute.filter_fields["c"])
+
+    @override_settings(AUTOFILTER_LOOKUP_POLICY="drf_tweaks.autofilter.IndexLookupPolicy")
+    def test_default_policy_setting(self):
+        @autofilter()
+        class SampleApi(ListAPIView):
+            serializer_class = SampleModelWithIndexesSerializer
+            queryset = SampleModelWithIndexes.objects.all()
+
+        self.assertNotIn("icontains", SampleApi.filter_fields["c"])
+
+
+class TestLazyAutoFilter(TestCase):
+    def get_view_class(self, lazy=True):
+        calls = []
+
+        @autofilter(lazy=lazy)
+        class SampleApi(ListAPIView):
+            serializer_class = SampleModelWithIndexesSerializer
+            queryset = SampleModelWithIndexes.objects.all()
+
+            def get_serializer_class(self):
+                calls.append(1)
+                return super().get_serializer_class()
+
+        return SampleApi, calls
+
+    def test_computed_on_first_access(self):
+        view_class, calls = self.get_view_class()
+        self.assertEqual(calls, [])
+        self.assertTrue(view_class._autofiltered)
+
+        self.assertIn("a", view_class.filter_fields)
+        self.assertEqual(calls, [1])
+        self.assertIn(DjangoFilterBackend, view_class().filter_backends)
+        self.assertIn("a", view_class.ordering_fields)
+        self.assertEqual(calls, [1])
+
+    def test_not_lazy(self):
+        view_class, calls = self.get_view_class(lazy=False)
+        self.assertEqual(calls, [1])
+        self.assertIn("a", view_class.filter_fields)
+
+    def test_resolve_autofilters(self):
+        view_class, calls = self.get_view_class()
+        resolve_autofilters()
+        self.assertEqual(calls, [1])
+        self.assertIn("a", view_class.filter_fields)
+        self.assertEqual(calls, [1])
+
+    def test_concurrent_first_access(self):
+        view_class, calls = self.get_view_class()
+        started = threading.Event()
+        read_values = {}
+
+        def slow_get_model_indexes(*args, **kwargs):
+            started.set()
+            threading.Event().wait(0.1)
+            return get_model_indexes(*args, **kwargs)
+
+        def read():
+            started.wait()
+            read_values["filter_backends"] = list(view_class.filter_backends)
+            read_values["filter_fields"] = getattr(view_class, "filter_fields", None)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        with mock.patch("drf_tweaks.autofilter.get_model_indexes", side_effect=slow_get_model_indexes):
+            self.assertIn("a", view_class.ordering_fields)
+        reader.join()
+        self.assertIn(DjangoFilterBackend, read_values["filter_backends"])
+        self.assertIn("a", read_values["filter_fields"])
+        self.assertEqual(calls, [1])
+
+    def test_inherited_attributes(self):
+        view_class, calls = self.get_view_class()
+
+        class SampleSubclassApi(view_class):
+            pass
+
+        self.assertIn("a", SampleSubclassApi.filter_fields)
+        self.assertEqual(calls, [1])
+
+
+@override_settings(ROOT_URLCONF="tests.test_autofilter")
+class TestRelatedAutoFilter(TestCase):
+    def test_related_index_paths(self):
+        fields = ["id", "related", "non_indexed_related", "one"]
+        # only indexed relations, to indexed fields of related models
+        self.assertEqual(
+            [path for path, _, _ in get_related_index_paths(SampleModelWithRelatedIndexes, fields, 1)],
+            ["related__name", "related__parent"]
+        )
+        self.assertEqual(
+            [path for path, _, _ in get_related_index_paths(SampleModelWithRelatedIndexes, fields, 2)],
+            ["related__name", "related__parent", "related__parent__a", "related__parent__c", "related__parent__d",
+             "related__parent__f"]
+        )
+
+    def test_related_filters_and_ordering(self):
+        # only fields exposed by nested serializers (a & f of the parent are indexed, but not visible)
+        self.assertEqual(
+            set(SampleApiWithRelatedIndexes.filter_fields.keys()),
+            {"id", "related", "one", "related__name", "related__parent", "related__parent__c", "related__parent__d"}
+        )
+        self.assertIn("related__name", SampleApiWithRelatedIndexes.ordering_fields)
+        self.assertIn("related__parent__c", SampleApiWithRelatedIndexes.ordering_fields)
+        self.assertNotIn("related__parent__a", SampleApiWithRelatedIndexes.ordering_fields)
+
+        @autofilter(related_depth=1, exclude_fields=("related__parent", ))
+        class SampleApi(ListAPIView):
+            serializer_class = SampleModelWithRelatedIndexesSerializer
+            queryset = SampleModelWithRelatedIndexes.objects.all()
+
+        self.assertEqual(
+            {key for key in SampleApi.filter_fields.keys() if "__" in key}, {"related__name"}
+        )
+
+    def test_related_fields_allow_list(self):
+        @autofilter(related_depth=2)
+        class SampleIdsApi(ListAPIView):
+            serializer_class = SampleModelWithRelatedIdsSerializer
+            queryset = SampleModelWithRelatedIndexes.objects.all()
+
+        self.assertEqual({key for key in SampleIdsApi.filter_fields.keys() if "__" in key}, set())
+
+        @autofilter(related_depth=2, related_fields=("related__name", "related__parent__a", "related__non_indexed"))
+        class SampleAllowedApi(ListAPIView):
+            serializer_class = SampleModelWithRelatedIdsSerializer
+            queryset = SampleModelWithRelatedIndexes.objects.all()
+
+        self.assertEqual(
+            {key for key in SampleAllowedApi.filter_fields.keys() if "__" in key},
+            {"related__name", "related__parent__a"}
+        )
+
+    def test_integration_related_filter(self):
+        parent = SampleModelWithIndexes.objects.create(a=1, b=1, c="c", d=1, e=1, f="f", g=1, h=1, non_indexed=1)
+        related_a = SampleRelatedModelWithIndexes.objects.create(
+            name="a", non_indexed="a", parent=parent, non_indexed_parent=parent
+        )
+        related_b = SampleRelatedModelWithIndexes.objects.create(
+            name="b", non_indexed="b", parent=parent, non_indexed_parent=parent
+        )
+        obj_a = SampleModelWithRelatedIndexes.objects.create(related=related_a, non_indexed_related=related_a)
+        obj_b = SampleModelWithRelatedIndexes.objects.create(related=related_b, non_indexed_related=related_b)
+
+        response = self.client.get(reverse("autofilter_with_related_indexes_test"), data={"related__name": "b"})
+        self.assertEqual([item["id"] for item in response.data], [obj_b.id])
+
+        response = self.client.get(reverse("autofilter_with_related_indexes_test"),
+                                   data={"ordering": "-related__name"})
+        self.assertEqual([item["id"] for item in response.data], [obj_b.id, obj_a.id])
+
+
+@override_settings(ROOT_URLCONF="tests.test_autofilter")
+class TestCompactInFilter(TestCase):
+    def setUp(self):
+        self.objects = [
+            SampleModelWithIndexes.objects.create(a=a, b=1, c=str(a), d=a, e=1, f=str(a), g=1, h=1, non_indexed=1)
+            for a in range(1, 7)
+        ]
+
+    def get_ids(self, data):
+        response = self.client.get(reverse("autofilter_with_compact_in_test"), data=data)
+        self.assertEqual(response.status_code, 200)
+        return [item["a"] for item in response.data]
+
+    def test_backend(self):
+        self.assertIn(CompactInFilterBackend, SampleApiWithCompactIn.filter_backends)
+        self.assertNotIn(DjangoFilterBackend, SampleApiWithCompactIn.filter_backends)
+
+    def test_values_and_ranges(self):
+        self.assertEqual(self.get_ids({"a__in": "1,3"}), [1, 3])
+        self.assertEqual(self.get_ids({"a__in": "2..4,6,6"}), [2, 3, 4, 6])
+        self.assertEqual(self.get_ids({"c__in": "1,5"}), [1, 5])
+        self.assertEqual(self.get_ids({"c__in": "1..5"}), [])
+
+    def test_invalid_values(self):
+        response = self.client.get(reverse("autofilter_with_compact_in_test"), data={"a__in": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_related_values_not_fetched(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("autofilter_with_related_compact_in_test"), data={"related__in": "1,2,3"}
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_above_threshold(self):
+        compact_in_filter = CompactInFilter(field_name="a", threshold=2)
+        self.assertEqual(
+            compact_in_filter.get_query([7, 1, 2, 3, 4, 10, 8, 1, 12], [(20, 30)]),
+            Q(a__range=(20, 30)) | Q(a__range=(1, 4)) | Q(a__drf_tweaks_values_in=[7, 8, 10, 12])
+        )
+        self.assertEqual(compact_in_filter.get_query([3, 1], []), Q(a__in=[3, 1]))
+
+    def test_values_sent_as_single_parameter(self):
+        compact_in_filter = CompactInFilter(field_name="a", threshold=2)
+        queryset = SampleModelWithIndexes.objects.filter(compact_in_filter.get_query(list(range(1, 3000, 2)), []))
+        sql, params = queryset.query.sql_with_params()
+        self.assertIn("json_each", sql)
+        self.assertEqual(len(params), 1)
+        self.assertEqual(sorted(queryset.values_list("a", flat=True)), [1, 3, 5])
+
+    def test_filter_search(self):
+        response = self.client.post(
+            reverse("autofilter_with_compact_in_test") + "?filter_search",
+            data=json.dumps({"a__in": [1, "4..5"], "ordering": "-a"}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["a"] for item in response.data], [5, 4, 1])
+
+        response = self.client.post(
+            reverse("autofilter_with_compact_in_test"), data=json.dumps({"a__in": [1]}),
+            content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_filter_search_links(self):
+        with mock.patch.object(SampleApiWithCompactIn, "pagination_class", LimitOffsetPagination):
+            response = self.client.post(
+                reverse("autofilter_with_compact_in_test") + "?filter_search&limit=2",
+                data=json.dumps({"a__in": [2, 4, 5, 6]}), content_type="application/json"
+            )
+            self.assertEqual([item["a"] for item in response.data["results"]], [2, 4])
+            self.assertNotIn("filter_search", response.data["next"])
+
+            response = self.client.get(response.data["next"])
+        self.assertEqual([item["a"] for item in response.data["results"]], [5, 6])
+
+    def test_filter_search_csrf(self):
+        user = User.objects.create_user(username="user", password="password")
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(user)
+        response = client.post(
+            reverse("autofilter_with_compact_in_test") + "?filter_search",
+            data=json.dumps({"a__in": [1]}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 403)
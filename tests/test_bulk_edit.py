@@ -1,12 +1,21 @@
-from django.db import models
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import re_path
 from django.urls import reverse
 from rest_framework import serializers
 from rest_framework.generics import ListCreateAPIView
+from rest_framework.response import Response
 from rest_framework.test import APITestCase
 
-from drf_tweaks.mixins import BulkEditAPIMixin
+from drf_tweaks.mixins import BulkEditAPIMixin, CacheIdempotencyStore
+from drf_tweaks.test_utils import query_lock_limiter
 
 
 class FakeModel(models.Model):
@@ -16,12 +25,44 @@ class FakeModel(models.Model):
         ordering = ("id",)
 
 
+class FakeUniqueModel(models.Model):
+    code = models.CharField(max_length=10, unique=True)
+    group = models.IntegerField()
+    position = models.IntegerField()
+    parent = models.ForeignKey(FakeModel, null=True, db_constraint=False, on_delete=models.DO_NOTHING)
+
+    class Meta:
+        ordering = ("id",)
+        unique_together = ("group", "position")
+
+
+class FakeVersionedModel(models.Model):
+    value = models.IntegerField()
+    version = models.IntegerField(default=1)
+
+    class Meta:
+        ordering = ("id",)
+
+
 class FakeSerializer(serializers.ModelSerializer):
     class Meta:
         model = FakeModel
         fields = ["id", "value"]
 
 
+class FakeUniqueSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FakeUniqueModel
+        fields = ["id", "code", "group", "position", "parent"]
+
+
+class FakeVersionedSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FakeVersionedModel
+        fields = ["id", "value", "version"]
+        read_only_fields = ["version"]
+
+
 class BulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
     queryset = FakeModel.objects.all()
     serializer_class = FakeSerializer
@@ -31,8 +72,83 @@ class BulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
     BULK_EDIT_MAX_ITEMS = 10
 
 
+class BatchedBulkEditAPI(BulkEditAPI):
+    BULK_EDIT_BATCHED = True
+
+
+class BatchedValidationBulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
+    queryset = FakeUniqueModel.objects.all()
+    serializer_class = FakeUniqueSerializer
+    details_serializer_class = FakeUniqueSerializer
+    permission_classes = []
+    BULK_EDIT_BATCHED_VALIDATION = True
+
+
+class AtomicBulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
+    queryset = FakeUniqueModel.objects.select_related("parent")
+    serializer_class = FakeUniqueSerializer
+    details_serializer_class = FakeUniqueSerializer
+    permission_classes = []
+    BULK_EDIT_ALLOW_DELETE_ITEMS = True
+    BULK_EDIT_ATOMIC = True
+
+
+class VersionedBulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
+    queryset = FakeVersionedModel.objects.all()
+    serializer_class = FakeVersionedSerializer
+    details_serializer_class = FakeVersionedSerializer
+    permission_classes = []
+    BULK_EDIT_ALLOW_DELETE_ITEMS = True
+    BULK_EDIT_BATCHED = True
+    BULK_EDIT_VERSION_FIELD = "version"
+
+
+class ImmediateExecutor(object):
+    def submit(self, function, *args, **kwargs):
+        function(*args, **kwargs)
+
+
+class AsyncBulkEditAPI(BulkEditAPI):
+    BULK_EDIT_ASYNC_THRESHOLD = 3
+    BULK_EDIT_ASYNC_CHUNK_SIZE = 2
+    BULK_EDIT_ASYNC_EXECUTOR = ImmediateExecutor()
+
+
+class StreamingBulkEditAPI(BulkEditAPI):
+    BULK_EDIT_STREAMING = True
+    BULK_EDIT_STREAMING_CHUNK_SIZE = 2
+    BULK_EDIT_RESPONSE = "ids"
+
+
+class SkipUnchangedBulkEditAPI(BulkEditAPIMixin, ListCreateAPIView):
+    queryset = FakeUniqueModel.objects.all()
+    serializer_class = FakeUniqueSerializer
+    details_serializer_class = FakeUniqueSerializer
+    permission_classes = []
+    BULK_EDIT_SKIP_UNCHANGED = True
+
+
+class IdempotentBulkEditAPI(BulkEditAPI):
+    BULK_EDIT_IDEMPOTENCY = True
+
+
+class ParallelValidationBulkEditAPI(BatchedValidationBulkEditAPI):
+    BULK_EDIT_PARALLEL_VALIDATION = True
+
+
 urlpatterns = [
     re_path(r"^fakeapi$", BulkEditAPI.as_view(), name="bulkedit"),
+    re_path(r"^fakeapi-batched$", BatchedBulkEditAPI.as_view(), name="bulkedit_batched"),
+    re_path(r"^fakeapi-batched-validation$", BatchedValidationBulkEditAPI.as_view(),
+            name="bulkedit_batched_validation"),
+    re_path(r"^fakeapi-parallel-validation$", ParallelValidationBulkEditAPI.as_view(),
+            name="bulkedit_parallel_validation"),
+    re_path(r"^fakeapi-atomic$", AtomicBulkEditAPI.as_view(), name="bulkedit_atomic"),
+    re_path(r"^fakeapi-async$", AsyncBulkEditAPI.as_view(), name="bulkedit_async"),
+    re_path(r"^fakeapi-streaming$", StreamingBulkEditAPI.as_view(), name="bulkedit_streaming"),
+    re_path(r"^fakeapi-skip-unchanged$", SkipUnchangedBulkEditAPI.as_view(), name="bulkedit_skip_unchanged"),
+    re_path(r"^fakeapi-idempotent$", IdempotentBulkEditAPI.as_view(), name="bulkedit_idempotent"),
+    re_path(r"^fakeapi-versioned$", VersionedBulkEditAPI.as_view(), name="bulkedit_versioned"),
 ]
 
 
@@ -92,3 +208,536 @@ class BulkEditMixinTestCase(APITestCase):
             {"id": self.first_item.pk, "value": 100},
             {"id": 3, "value": -1}
         ])
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class BatchedBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_batched")
+        self.items = [FakeModel.objects.create(value=i) for i in range(6)]
+
+    def _call_api(self, data, expected_status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, expected_status_code, response.content)
+        return response, [query["sql"] for query in queries]
+
+    def _count_queries(self, queries, prefix):
+        return len([sql for sql in queries if sql.startswith(prefix)])
+
+    def test_batched_update_and_delete(self):
+        data = [
+            {"id": self.items[0].pk, "value": 100},
+            {"id": self.items[1].pk, "value": 101},
+            {"id": self.items[2].pk, "value": 102},
+            {"id": self.items[3].pk, "delete_object": True},
+            {"id": self.items[4].pk, "delete_object": True},
+        ]
+        response, queries = self._call_api(data)
+        self.assertEqual(self._count_queries(queries, "UPDATE"), 1)
+        self.assertEqual(self._count_queries(queries, "DELETE"), 1)
+        self.assertEqual(response.data, [
+            {"id": self.items[0].pk, "value": 100},
+            {"id": self.items[1].pk, "value": 101},
+            {"id": self.items[2].pk, "value": 102},
+            {"id": self.items[5].pk, "value": 5},
+        ])
+
+    def test_creating_without_returning_pks_from_bulk_insert(self):
+        with mock.patch.object(connection.features, "can_return_rows_from_bulk_insert", False):
+            response, queries = self._call_api([{"temp_id": -1, "value": -1}, {"temp_id": -2, "value": -2}])
+        self.assertEqual(self._count_queries(queries, "INSERT"), 2)
+        self.assertEqual(FakeModel.objects.filter(value__lt=0).count(), 2)
+
+    def test_batched_create(self):
+        def bulk_create(objects):
+            # sqlite backend cannot return primary keys from bulk insert
+            for obj in objects:
+                obj.save()
+            return objects
+
+        with mock.patch.object(connection.features, "can_return_rows_from_bulk_insert", True), \
+                mock.patch.object(FakeModel.objects, "bulk_create", side_effect=bulk_create) as bulk_create_mock:
+            self._call_api([{"temp_id": -1, "value": -1}, {"temp_id": -2, "value": -2}])
+        bulk_create_mock.assert_called_once()
+        self.assertEqual([obj.value for obj in bulk_create_mock.call_args[0][0]], [-1, -2])
+        self.assertEqual(FakeModel.objects.filter(value__lt=0).count(), 2)
+
+    def test_validation_errors(self):
+        data = [{"id": self.items[0].pk, "value": 100}, {"temp_id": 1}]
+        response, queries = self._call_api(data, 400)
+        self.assertEqual(response.data, [{"temp_id": "1", "value": ["This field is required."]}])
+        self.assertEqual(self._count_queries(queries, "UPDATE"), 0)
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class BulkEditResponseTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit")
+        self.items = [FakeModel.objects.create(value=i) for i in range(4)]
+        self.data = [
+            {"id": self.items[0].pk, "value": 100},
+            {"id": self.items[1].pk, "delete_object": True},
+            {"temp_id": 7, "value": 7},
+        ]
+
+    def _call_api(self, response_mode, expected_status_code=200):
+        with mock.patch.object(BulkEditAPI, "BULK_EDIT_RESPONSE", response_mode), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, expected_status_code, response.content)
+        return response, [query["sql"] for query in queries]
+
+    def test_list(self):
+        response, queries = self._call_api("list")
+        self.assertEqual(len(response.data), 4)
+
+    def test_objects(self):
+        response, queries = self._call_api("objects")
+        created = FakeModel.objects.get(value=7)
+        self.assertEqual(response.data, {
+            "created": {"7": {"id": created.pk, "value": 7}},
+            "updated": [{"id": self.items[0].pk, "value": 100}],
+            "deleted": [self.items[1].pk],
+        })
+        # the last query fetches affected objects only
+        self.assertIn("IN", queries[-1])
+        self.assertEqual(len([sql for sql in queries if sql.startswith("SELECT")]), 2)
+
+    def test_ids(self):
+        response, queries = self._call_api("ids")
+        self.assertEqual(response.data, {
+            "created": {"7": FakeModel.objects.get(value=7).pk},
+            "updated": [self.items[0].pk],
+            "deleted": [self.items[1].pk],
+        })
+        self.assertEqual(len([sql for sql in queries if sql.startswith("SELECT")]), 1)
+
+    def test_empty(self):
+        response, queries = self._call_api("empty", 204)
+        self.assertEqual(FakeModel.objects.get(pk=self.items[0].pk).value, 100)
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class BatchedValidationBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_batched_validation")
+        self.parents = [FakeModel.objects.create(value=i) for i in range(3)]
+        self.items = [
+            FakeUniqueModel.objects.create(code="a", group=1, position=1, parent=self.parents[0]),
+            FakeUniqueModel.objects.create(code="b", group=1, position=2),
+        ]
+
+    def _call_api(self, data, expected_status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, expected_status_code, response.content)
+        return response, [query["sql"] for query in queries]
+
+    def test_one_query_per_validator_and_field(self):
+        data = [
+            {"temp_id": i, "code": "c%d" % i, "group": 2, "position": i, "parent": self.parents[i % 3].pk}
+            for i in range(1, 9)
+        ]
+        response, queries = self._call_api(data)
+        selects = [sql for sql in queries if sql.startswith("SELECT")]
+        # parents, unique code, unique together - then list
+        self.assertEqual(len(selects), 4)
+        self.assertEqual(FakeUniqueModel.objects.count(), 10)
+        self.assertEqual(FakeUniqueModel.objects.get(code="c4").parent, self.parents[1])
+
+    def test_updating_with_own_values(self):
+        data = [
+            {"id": self.items[0].pk, "code": "a", "group": 1, "position": 1, "parent": self.parents[1].pk},
+            {"id": self.items[1].pk, "code": "b", "position": 2},
+        ]
+        self._call_api(data)
+        self.assertEqual(FakeUniqueModel.objects.get(pk=self.items[0].pk).parent, self.parents[1])
+
+    def test_errors(self):
+        data = [
+            {"id": self.items[0].pk, "code": "b"},
+            {"id": self.items[1].pk, "position": 1},
+            {"temp_id": 1, "code": "c", "group": 2, "position": 1, "parent": 999},
+            {"temp_id": 2, "code": "c", "group": 2, "position": 1, "parent": "x"},
+            {"temp_id": 3, "code": "d", "group": 3, "position": 1},
+        ]
+        response, queries = self._call_api(data, 400)
+        self.assertEqual(response.data, [
+            {"temp_id": "1", "parent": ['Invalid pk "999" - object does not exist.']},
+            {
+                "temp_id": "2",
+                "parent": ["Incorrect type. Expected pk value, received str."],
+                "code": ["fake unique model with this code already exists."],
+            },
+            {"id": str(self.items[0].pk), "code": ["fake unique model with this code already exists."]},
+            {"id": str(self.items[1].pk), "non_field_errors": ["The fields group, position must make a unique set."]},
+        ])
+        self.assertEqual(FakeUniqueModel.objects.count(), 2)
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class AtomicBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_atomic")
+        parent = FakeModel.objects.create(value=1)
+        self.items = [
+            FakeUniqueModel.objects.create(code=str(i), group=1, position=i, parent=parent) for i in range(3)
+        ]
+
+    def test_locking_in_pk_order(self):
+        queryset = AtomicBulkEditAPI().get_bulk_edit_queryset()
+        self.assertTrue(queryset.query.select_for_update)
+        self.assertEqual(queryset.query.select_for_update_of, ("self", ))
+        self.assertEqual(queryset.query.order_by, ("pk", ))
+
+    def test_compatible_with_query_lock_limiter(self):
+        data = [{"id": self.items[2].pk, "code": "x"}, {"id": self.items[0].pk, "delete_object": True}]
+        with query_lock_limiter(enable=True):
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(FakeUniqueModel.objects.get(pk=self.items[2].pk).code, "x")
+        self.assertFalse(FakeUniqueModel.objects.filter(pk=self.items[0].pk).exists())
+
+    def test_rollback(self):
+        data = [{"id": self.items[0].pk, "code": "x"}, {"id": self.items[1].pk, "delete_object": True}]
+        with mock.patch.object(FakeUniqueModel, "delete", side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.client.put(self.url, data, format="json")
+        self.assertEqual(FakeUniqueModel.objects.get(pk=self.items[0].pk).code, "0")
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class VersionedBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_versioned")
+        self.items = [FakeVersionedModel.objects.create(value=i, version=i + 1) for i in range(4)]
+
+    def _call_api(self, data, expected_status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, expected_status_code, response.content)
+        return response, [query["sql"] for query in queries]
+
+    def test_conditional_update(self):
+        data = [
+            {"id": self.items[0].pk, "value": 100, "version": 1},
+            {"id": self.items[1].pk, "value": 101, "version": 2},
+            {"id": self.items[2].pk, "delete_object": True, "version": 3},
+            {"temp_id": 1, "value": 5},
+        ]
+        response, queries = self._call_api(data)
+        # one conditional UPDATE for all versions, then one bulk UPDATE of values
+        self.assertEqual(len([sql for sql in queries if sql.startswith("UPDATE")]), 2)
+        self.assertEqual([(item["value"], item["version"]) for item in response.data], [
+            (100, 2), (101, 3), (3, 4), (5, 1)
+        ])
+
+    def test_missing_version(self):
+        response, _ = self._call_api([{"id": self.items[0].pk, "value": 100}], 400)
+        self.assertEqual(response.data, [{"id": str(self.items[0].pk), "version": ["This field is required."]}])
+
+    def test_stale_version(self):
+        data = [
+            {"id": self.items[0].pk, "value": 100, "version": 1},
+            {"id": self.items[1].pk, "value": 101, "version": 1},
+        ]
+        response, queries = self._call_api(data, 409)
+        self.assertEqual(response.data, [
+            {"id": str(self.items[1].pk), "version": ["This item has been changed in the meantime."]}
+        ])
+        self.assertEqual(len([sql for sql in queries if sql.startswith("UPDATE")]), 0)
+
+    def test_changed_during_validation(self):
+        def concurrent_edit(bulk_edit_items):
+            FakeVersionedModel.objects.filter(pk=self.items[1].pk).update(value=-1, version=10)
+            for _, _, _, serializer, _ in bulk_edit_items:
+                serializer.is_valid()
+
+        data = [
+            {"id": self.items[0].pk, "value": 100, "version": 1},
+            {"id": self.items[1].pk, "value": 101, "version": 2},
+        ]
+        with mock.patch.object(VersionedBulkEditAPI, "_validate_bulk_edit_items", side_effect=concurrent_edit):
+            response, _ = self._call_api(data, 409)
+        self.assertEqual(response.data, [
+            {"id": str(self.items[1].pk), "version": ["This item has been changed in the meantime."]}
+        ])
+        self.assertEqual(list(FakeVersionedModel.objects.values_list("value", "version")[:2]), [(0, 1), (-1, 10)])
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class AsyncBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_async")
+        self.items = [FakeModel.objects.create(value=i) for i in range(4)]
+
+    def test_below_threshold(self):
+        response = self.client.put(self.url, [{"id": self.items[0].pk, "value": 100}], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 4)
+
+    def test_job(self):
+        data = [
+            {"id": self.items[0].pk, "value": 100},
+            {"id": self.items[1].pk, "value": 101},
+            {"id": self.items[2].pk, "value": 102},
+            {"temp_id": 1, "value": "incorrect"},
+            {"temp_id": 2, "value": 6},
+        ]
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        self.assertEqual(response.data["url"], f"http://testserver/fakeapi-async?bulk_edit_job={response.data['id']}")
+
+        response = self.client.get(response.data["url"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["status"], "finished")
+        self.assertEqual(response.data["total"], 5)
+        self.assertEqual(response.data["processed"], 5)
+        self.assertEqual(response.data["failed"], 1)
+        self.assertEqual(
+            response.data["errors"], [{"temp_id": "1", "value": ["A valid integer is required."]}]
+        )
+
+        # items of the chunk with the incorrect item (created items go first) are retried one by one
+        self.assertEqual(list(FakeModel.objects.values_list("value", flat=True)), [100, 101, 102, 3, 6])
+
+    def test_job_chunk_with_several_incorrect_items(self):
+        data = [{"id": self.items[0].pk, "value": "a"}, {"id": self.items[1].pk, "value": "b"}] + [
+            {"temp_id": temp_id, "value": temp_id} for temp_id in range(1, 5)
+        ]
+        response = self.client.get(self.client.put(self.url, data, format="json").data["url"])
+        self.assertEqual(response.data["status"], "finished")
+        self.assertEqual((response.data["processed"], response.data["failed"]), (6, 2))
+        self.assertEqual(
+            response.data["errors"], [
+                {"id": str(self.items[0].pk), "value": ["A valid integer is required."]},
+                {"id": str(self.items[1].pk), "value": ["A valid integer is required."]},
+            ]
+        )
+        self.assertEqual(list(FakeModel.objects.values_list("value", flat=True)), [0, 1, 2, 3, 1, 2, 3, 4])
+
+    def test_job_of_other_user(self):
+        data = [{"id": item.pk, "value": 100} for item in self.items]
+        self.client.force_authenticate(User.objects.create_user(username="owner", password="password"))
+        url = self.client.put(self.url, data, format="json").data["url"]
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("user_id", response.data)
+
+        self.client.force_authenticate(User.objects.create_user(username="other", password="password"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_job_does_not_exist(self):
+        self.assertEqual(self.client.get(self.url, {"bulk_edit_job": "abc"}).status_code, 404)
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class StreamingBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_streaming")
+        self.items = [FakeModel.objects.create(value=i) for i in range(4)]
+
+    def test_chunks(self):
+        data = [
+            {"temp_id": 1, "value": 5},
+            {"id": self.items[0].pk, "value": 100},
+            {"id": self.items[1].pk, "delete_object": True},
+            {"temp_id": 2, "value": 6},
+            {"id": self.items[2].pk, "value": 102},
+        ]
+        with mock.patch.object(
+            StreamingBulkEditAPI, "_perform_bulk_edit", side_effect=StreamingBulkEditAPI._perform_bulk_edit,
+            autospec=True,
+        ) as perform_bulk_edit:
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(perform_bulk_edit.call_count, 3)
+        self.assertEqual(response.data["updated"], [self.items[0].pk, self.items[2].pk])
+        self.assertEqual(response.data["deleted"], [self.items[1].pk])
+        self.assertEqual(list(FakeModel.objects.values_list("value", flat=True)), [100, 102, 3, 5, 6])
+
+    def test_failing_chunk_rolls_back_all_chunks(self):
+        data = [{"id": self.items[0].pk, "value": 100}, {"id": self.items[1].pk, "value": 101}, {"temp_id": 1}]
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, [{"temp_id": "1", "value": ["This field is required."]}])
+        self.assertEqual(list(FakeModel.objects.values_list("value", flat=True)), [0, 1, 2, 3])
+
+    def test_failing_chunk_without_atomic(self):
+        data = [{"id": self.items[0].pk, "value": 100}, {"id": self.items[1].pk, "value": 101}, {"temp_id": 1}]
+        with mock.patch.object(StreamingBulkEditAPI, "BULK_EDIT_STREAMING_ATOMIC", False):
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(FakeModel.objects.values_list("value", flat=True)), [100, 101, 2, 3])
+
+    def test_max_items_and_incorrect_payload(self):
+        with mock.patch.object(StreamingBulkEditAPI, "BULK_EDIT_MAX_ITEMS", 2):
+            response = self.client.put(self.url, [{"id": self.items[0].pk, "value": 100}] * 3, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"non_field_errors": ["Cannot edit more than 2 items at once."]})
+        self.assertEqual(FakeModel.objects.get(pk=self.items[0].pk).value, 0)
+
+        response = self.client.put(self.url, {"id": self.items[0].pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data, {"non_field_errors": ["Payload for bulk edit must be a list of objects to edit."]}
+        )
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class SkipUnchangedBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_skip_unchanged")
+        self.parents = [FakeModel.objects.create(value=i) for i in range(2)]
+        self.items = [
+            FakeUniqueModel.objects.create(code=str(i), group=1, position=i, parent=self.parents[0]) for i in range(3)
+        ]
+        self.data = [
+            {"id": item.pk, "code": item.code, "group": 1, "position": item.position, "parent": self.parents[0].pk}
+            for item in self.items
+        ]
+        self.data[1].update({"code": "x", "parent": self.parents[1].pk})
+        self.data[2]["position"] = 10
+
+    def _get_updates(self, batched):
+        with mock.patch.object(SkipUnchangedBulkEditAPI, "BULK_EDIT_BATCHED", batched), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, self.data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            list(FakeUniqueModel.objects.values_list("code", "position", "parent")),
+            [("0", 0, self.parents[0].pk), ("x", 1, self.parents[1].pk), ("2", 10, self.parents[0].pk)],
+        )
+        return [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+
+    def test_changed_columns_only(self):
+        updates = self._get_updates(batched=False)
+        self.assertEqual(len(updates), 2)
+        self.assertIn('SET "code" = \'x\', "parent_id" = %d WHERE' % self.parents[1].pk, updates[0])
+        self.assertIn('SET "position" = 10 WHERE', updates[1])
+
+    def test_changed_columns_only_batched(self):
+        updates = self._get_updates(batched=True)
+        self.assertEqual(len(updates), 2)
+        self.assertNotIn('"group"', " ".join(updates))
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class IdempotentBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("bulkedit_idempotent")
+        self.item = FakeModel.objects.create(value=1)
+        self.data = [{"id": self.item.pk, "value": 100}, {"temp_id": 1, "value": 5}]
+
+    def _call_api(self, data, key="abc", expected_status_code=200):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, data, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        self.assertEqual(response.status_code, expected_status_code, response.content)
+        return response, queries
+
+    def test_replay(self):
+        response, _ = self._call_api(self.data)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+        replayed_response, queries = self._call_api(self.data)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(replayed_response["Idempotent-Replayed"], "true")
+        self.assertEqual(replayed_response.data, response.data)
+        self.assertEqual(FakeModel.objects.count(), 2)
+
+        # other key - processed again
+        self._call_api(self.data, key="other")
+        self.assertEqual(FakeModel.objects.count(), 3)
+
+    def test_different_payload(self):
+        self._call_api(self.data)
+        self._call_api([{"id": self.item.pk, "value": 200}], expected_status_code=422)
+        self.assertEqual(FakeModel.objects.get(pk=self.item.pk).value, 100)
+
+    def test_failed_requests_are_not_stored(self):
+        self._call_api([{"temp_id": 1}], expected_status_code=400)
+        self._call_api([{"temp_id": 1}], expected_status_code=400)
+        # the key can be used with corrected payload
+        self._call_api([{"temp_id": 1, "value": 5}])
+        self.assertEqual(FakeModel.objects.count(), 2)
+
+    def test_request_in_progress(self):
+        def retry(*args, **kwargs):
+            self._call_api(self.data, expected_status_code=409)
+            return Response([])
+
+        with mock.patch.object(IdempotentBulkEditAPI, "_bulk_edit", side_effect=retry):
+            self._call_api(self.data)
+
+    def test_lock_timeout(self):
+        store = mock.Mock(wraps=CacheIdempotencyStore())
+        with mock.patch.object(IdempotentBulkEditAPI, "BULK_EDIT_IDEMPOTENCY_STORE", store):
+            self._call_api(self.data)
+        self.assertEqual(store.add.call_args[0][2], IdempotentBulkEditAPI.BULK_EDIT_IDEMPOTENCY_LOCK_TIMEOUT)
+        self.assertEqual(store.set.call_args[0][2], IdempotentBulkEditAPI.BULK_EDIT_IDEMPOTENCY_TIMEOUT)
+
+    def test_lock_released_on_system_exit(self):
+        with mock.patch.object(IdempotentBulkEditAPI, "_bulk_edit", side_effect=SystemExit), \
+                self.assertRaises(SystemExit):
+            self.client.put(self.url, self.data, format="json", HTTP_IDEMPOTENCY_KEY="abc")
+        self._call_api(self.data)
+        self.assertEqual(FakeModel.objects.count(), 2)
+
+
+@override_settings(ROOT_URLCONF="tests.test_bulk_edit")
+class ParallelValidationBulkEditMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("bulkedit_parallel_validation")
+        self.parent = FakeModel.objects.create(value=1)
+        FakeUniqueModel.objects.create(code="a", group=1, position=1)
+
+    def test_errors_in_input_order(self):
+        data = [
+            {"temp_id": i, "code": "x" if i % 3 else "a", "group": 2, "position": i, "parent": self.parent.pk}
+            for i in range(1, 30)
+        ] + [{"temp_id": 30, "code": "y", "group": 2, "position": "incorrect"}]
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 400, response.content)
+        # the first "x" is not reported as duplicate, other "x" and all "a" are
+        self.assertEqual([error["temp_id"] for error in response.data], [str(i) for i in range(2, 31)])
+        self.assertEqual(response.data[-1], {"temp_id": "30", "position": ["A valid integer is required."]})
+
+    def test_success(self):
+        data = [
+            {"temp_id": i, "code": str(i), "group": 2, "position": i, "parent": self.parent.pk} for i in range(1, 20)
+        ]
+        response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(FakeUniqueModel.objects.filter(parent=self.parent).count(), 19)
+
+    def test_default_process_pool(self):
+        self.assertIsInstance(ParallelValidationBulkEditAPI().get_bulk_edit_validation_executor(), ProcessPoolExecutor)
+
+    def test_thread_pool(self):
+        data = [
+            {"temp_id": 1, "code": "x", "group": 2, "position": 1, "parent": self.parent.pk},
+            {"temp_id": 2, "code": "x", "group": 2, "position": 2, "parent": 0},
+        ]
+        with mock.patch.object(ParallelValidationBulkEditAPI, "BULK_EDIT_VALIDATION_EXECUTOR", ThreadPoolExecutor()):
+            response = self.client.put(self.url, data, format="json")
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertEqual(response.data, [
+            {"temp_id": "2", "code": ["fake unique model with this code already exists."],
+             "parent": ['Invalid pk "0" - object does not exist.']},
+        ])
+
+    def test_queries_are_not_allowed(self):
+        def validate_value(self, value):
+            return FakeModel.objects.get(pk=value.pk)
+
+        data = [{"temp_id": 1, "code": "x", "group": 2, "position": 1, "parent": self.parent.pk}]
+        # patched serializer is not seen by already started processes
+        with mock.patch.object(ParallelValidationBulkEditAPI, "BULK_EDIT_VALIDATION_EXECUTOR", ThreadPoolExecutor()), \
+                mock.patch.object(FakeUniqueSerializer, "validate_parent", validate_value, create=True), \
+                self.assertRaisesRegex(ImproperlyConfigured, "'FakeUniqueSerializer' runs database queries"):
+            self.client.put(self.url, data, format="json")
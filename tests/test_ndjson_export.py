@@ -0,0 +1,80 @@
+import json
+
+from django.test import override_settings
+from django.urls import re_path
+from django.urls import reverse
+from rest_framework.generics import ListAPIView
+from rest_framework.test import APITestCase
+
+from drf_tweaks import serializers
+from drf_tweaks.mixins import NDJSONExportMixin
+from drf_tweaks.optimizator import AutoOptimizeMixin
+from drf_tweaks.pagination import NoCountsPageNumberPagination
+from tests.models import AutoOptimization1Model, AutoOptimization2Model, AutoOptimization3Model, SampleModel
+
+
+class SampleModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SampleModel
+        fields = ["id", "a", "b"]
+
+
+class AutoOptimization1Serializer(serializers.ModelSerializer):
+    sample_m2m = SampleModelSerializer(many=True)
+
+    class Meta:
+        model = AutoOptimization1Model
+        fields = ["id", "name", "sample_m2m"]
+
+
+class ExportPagination(NoCountsPageNumberPagination):
+    page_size = 2
+
+
+class ExportAPI(NDJSONExportMixin, AutoOptimizeMixin, ListAPIView):
+    queryset = AutoOptimization1Model.objects.order_by("-id")
+    serializer_class = AutoOptimization1Serializer
+    pagination_class = ExportPagination
+    permission_classes = []
+    NDJSON_EXPORT_CHUNK_SIZE = 2
+
+
+urlpatterns = [
+    re_path(r"^export$", ExportAPI.as_view(), name="export"),
+]
+
+
+@override_settings(ROOT_URLCONF="tests.test_ndjson_export")
+class NDJSONExportMixinTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse("export")
+        sample = SampleModel.objects.create(a="a", b="b")
+        third = AutoOptimization3Model.objects.create(name="3", sample=sample)
+        second = AutoOptimization2Model.objects.create(name="2", fk_3_1=third, fk_3_2=third, sample=sample)
+        self.sample = sample
+        self.items = []
+        for i in range(5):
+            item = AutoOptimization1Model.objects.create(name=str(i), fk_2=second)
+            item.sample_m2m.add(sample)
+            self.items.append(item)
+
+    def export(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return [json.loads(line) for line in b"".join(response.streaming_content).decode("utf-8").splitlines()]
+
+    def test_paginated_by_default(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["results"]), 2)
+
+    def test_export(self):
+        # 1 query for the items + 1 prefetch query per chunk of 2 items
+        with self.assertNumQueries(4):
+            items = self.export({"export": "ndjson"})
+        self.assertEqual([item["id"] for item in items], [item.id for item in reversed(self.items)])
+        self.assertEqual(items[0]["sample_m2m"], [{"id": self.sample.id, "a": "a", "b": "b"}])
+
+    def test_export_with_filtering_fields(self):
+        items = self.export({"export": "ndjson", "fields": "id,sample_m2m__a"})
+        self.assertEqual(items[0], {"id": self.items[-1].id, "sample_m2m": [{"a": "a"}]})
@@ -2,14 +2,28 @@
 """ Tests for NoCounts paginators - based on the tests of original paginators from DRF """
 from __future__ import unicode_literals
 
+import datetime
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory
 
-from drf_tweaks.pagination import (IncorrectLimitOffsetError,
+from drf_tweaks.pagination import (AnchorWindowPagination,
+                                   CachedCount,
+                                   CappedCount,
+                                   DeepPaginationError,
+                                   ExactCount,
+                                   IncorrectAnchorError,
+                                   IncorrectLimitOffsetError,
                                    NotFound,
                                    NoCountsLimitOffsetPagination,
-                                   NoCountsPageNumberPagination)
+                                   NoCountsPageNumberPagination,
+                                   pagination_metrics,
+                                   PlannerEstimateCount)
+from tests.models import SampleModelForPagination
 
 factory = APIRequestFactory()
 
@@ -102,6 +116,17 @@ class TestNoCountsLimitOffset(TestCase):
             'next': None
         })
 
+    def test_full_last_page(self):
+        request = Request(factory.get('/', {'limit': 5, 'offset': 95}))
+        queryset = self.paginate_queryset(request)
+        content = self.get_paginated_content(queryset)
+        self.assertEqual(queryset, [96, 97, 98, 99, 100])
+        self.assertEqual(content, {
+            'results': [96, 97, 98, 99, 100],
+            'previous': 'http://testserver/?limit=5&offset=90',
+            'next': None
+        })
+
     def test_erronous_offset(self):
         request = Request(factory.get('/', {'limit': 5, 'offset': 1000}))
         queryset = self.paginate_queryset(request)
@@ -164,6 +189,18 @@ class TestNoCountsPageNumberPagination(TestCase):
             'next': None
         })
 
+    def test_full_last_page(self):
+        self.queryset = range(1, 101)
+        request = Request(factory.get('/', {'page': 20}))
+        queryset = self.paginate_queryset(request)
+        content = self.get_paginated_content(queryset)
+        self.assertEqual(queryset, [96, 97, 98, 99, 100])
+        self.assertEqual(content, {
+            'results': [96, 97, 98, 99, 100],
+            'previous': 'http://testserver/?page=19',
+            'next': None
+        })
+
     def test_over_last_page(self):
         request = Request(factory.get('/', {'page': 21}))
         queryset = self.paginate_queryset(request)
@@ -178,3 +215,560 @@ class TestNoCountsPageNumberPagination(TestCase):
     def test_invalid_page(self):
         request = Request(factory.get('/', {'page': 0}))
         self.assertRaises(NotFound, self.paginate_queryset, request)
+
+
+class TestDeferredJoin(TestCase):
+    """ Tests for deferred join (late row lookup) mode of the NoCounts paginators. """
+
+    def setUp(self):
+        class ExampleLimitOffsetPagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            deferred_join = True
+
+        class ExamplePageNumberPagination(NoCountsPageNumberPagination):
+            page_size = 5
+            deferred_join = True
+
+        self.limit_offset_pagination = ExampleLimitOffsetPagination()
+        self.page_number_pagination = ExamplePageNumberPagination()
+        for i in range(20):
+            SampleModelForPagination.objects.create(value=i % 7, name=str(i))
+        self.queryset = SampleModelForPagination.objects.order_by("-value", "name")
+
+    def test_limit_offset_keeps_order(self):
+        request = Request(factory.get('/', {'limit': 5, 'offset': 7}))
+        with self.assertNumQueries(2):
+            results = self.limit_offset_pagination.paginate_queryset(self.queryset, request)
+        self.assertEqual(results, list(self.queryset[7:12]))
+
+    def test_page_number_keeps_order(self):
+        request = Request(factory.get('/', {'page': 3}))
+        with self.assertNumQueries(2):
+            results = self.page_number_pagination.paginate_queryset(self.queryset, request)
+        self.assertEqual(results, list(self.queryset[10:15]))
+
+    def test_not_used_for_values_and_distinct(self):
+        request = Request(factory.get('/', {'limit': 5, 'offset': 7}))
+        queryset = self.queryset.values("name")
+        with self.assertNumQueries(1):
+            results = self.limit_offset_pagination.paginate_queryset(queryset, request)
+        self.assertEqual(results, list(queryset[7:12]))
+
+        queryset = self.queryset.distinct()
+        with self.assertNumQueries(1):
+            self.limit_offset_pagination.paginate_queryset(queryset, request)
+
+
+class TestCursorHint(TestCase):
+    """ Tests for cursor hints in "next" links of the NoCounts paginators. """
+
+    def setUp(self):
+        class ExampleLimitOffsetPagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            cursor_query_param = 'cursor'
+
+        class ExamplePageNumberPagination(NoCountsPageNumberPagination):
+            page_size = 5
+            cursor_query_param = 'cursor'
+
+        self.limit_offset_pagination = ExampleLimitOffsetPagination()
+        self.page_number_pagination = ExamplePageNumberPagination()
+        for i in range(23):
+            SampleModelForPagination.objects.create(value=i % 4, name=str(i))
+        self.queryset = SampleModelForPagination.objects.order_by("-value")
+        self.ordered_ids = list(self.queryset.order_by("-value", "pk").values_list("pk", flat=True))
+
+    def paginate(self, pagination, url, queryset=None):
+        queryset = self.queryset if queryset is None else queryset
+        results = pagination.paginate_queryset(queryset, Request(factory.get(url)))
+        return pagination.get_paginated_response([getattr(item, 'pk', item) for item in results]).data
+
+    def assert_follows_next_links(self, pagination, url):
+        visited = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                content = self.paginate(pagination, url)
+            if 'cursor=' in url:
+                self.assertNotIn('OFFSET', queries[0]['sql'])
+            if content['previous']:
+                self.assertNotIn('cursor=', content['previous'])
+            visited += content['results']
+            url = content['next']
+        self.assertEqual(visited, self.ordered_ids)
+
+    def test_limit_offset_seeks_to_cursor(self):
+        self.assert_follows_next_links(self.limit_offset_pagination, '/')
+        content = self.paginate(self.limit_offset_pagination, '/?offset=5')
+        self.assertIn('cursor=', content['next'])
+        self.assertIn('offset=10', content['next'])
+
+    def test_page_number_seeks_to_cursor(self):
+        self.assert_follows_next_links(self.page_number_pagination, '/')
+
+    def test_cursor_for_different_position_is_ignored(self):
+        next_link = self.paginate(self.limit_offset_pagination, '/')['next']
+        url = next_link.replace('offset=5', 'offset=10')
+        self.assertEqual(self.paginate(self.limit_offset_pagination, url)['results'], self.ordered_ids[10:15])
+
+    def test_cursor_for_different_ordering_is_ignored(self):
+        next_link = self.paginate(self.limit_offset_pagination, '/')['next']
+        queryset = SampleModelForPagination.objects.order_by("value")
+        ordered_ids = list(queryset.order_by("value", "pk").values_list("pk", flat=True))
+        self.assertEqual(self.paginate(self.limit_offset_pagination, next_link, queryset)['results'],
+                         ordered_ids[5:10])
+
+    def test_malformed_cursor_is_ignored(self):
+        for cursor in ('invalid', 'eyJ4IjogMX0=', 'W10='):
+            url = '/?offset=5&cursor=%s' % cursor
+            self.assertEqual(self.paginate(self.limit_offset_pagination, url)['results'], self.ordered_ids[5:10])
+
+    def test_cursor_keeps_datetime_precision(self):
+        SampleModelForPagination.objects.all().delete()
+        created = datetime.datetime(2020, 1, 1, 12, 0, 0, 100)
+        ids = [
+            SampleModelForPagination.objects.create(value=0, created=created + datetime.timedelta(microseconds=i)).pk
+            for i in range(4)
+        ]
+        self.limit_offset_pagination.default_limit = 2
+        queryset = SampleModelForPagination.objects.order_by("created")
+        next_link = self.paginate(self.limit_offset_pagination, '/', queryset)['next']
+        self.assertEqual(self.paginate(self.limit_offset_pagination, next_link, queryset)['results'], ids[2:4])
+        self.assertEqual(self.limit_offset_pagination.fetch_method, "cursor")
+
+    def test_reversed_queryset(self):
+        queryset = SampleModelForPagination.objects.order_by("value").reverse()
+        ordered_ids = list(SampleModelForPagination.objects.order_by("-value", "-pk").values_list("pk", flat=True))
+        visited = []
+        url = '/'
+        while url:
+            content = self.paginate(self.limit_offset_pagination, url, queryset)
+            visited += content['results']
+            url = content['next']
+        self.assertEqual(visited, ordered_ids)
+        self.assertEqual(self.limit_offset_pagination.fetch_method, "cursor")
+
+    def test_no_cursor_for_unsupported_ordering(self):
+        content = self.paginate(self.limit_offset_pagination, '/', self.queryset.order_by("?"))
+        self.assertNotIn('cursor=', content['next'])
+
+        content = self.paginate(self.limit_offset_pagination, '/', range(1, 101))
+        self.assertNotIn('cursor=', content['next'])
+
+
+class TestBookmarks(TestCase):
+    """ Tests for offset-to-keyset bookmarks of the NoCounts paginators. """
+
+    def setUp(self):
+        class ExamplePagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            bookmarks_cache_alias = 'default'
+            bookmarks_min_offset = 5
+
+        self.pagination = ExamplePagination()
+        for i in range(30):
+            SampleModelForPagination.objects.create(value=i % 6, name=str(i))
+        self.queryset = SampleModelForPagination.objects.order_by("value")
+        cache.clear()
+
+    def get_ordered_ids(self):
+        return list(self.queryset.order_by("value", "pk").values_list("pk", flat=True))
+
+    def paginate(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            results = self.pagination.paginate_queryset(self.queryset, Request(factory.get('/', params)))
+        return [item.pk for item in results], [query['sql'] for query in queries]
+
+    def test_seeking_to_bookmark(self):
+        ordered_ids = self.get_ordered_ids()
+        ids, queries = self.paginate({'offset': 10})
+        self.assertEqual(ids, ordered_ids[10:15])
+        self.assertIn('OFFSET 10', queries[-1])
+
+        ids, queries = self.paginate({'offset': 17})
+        self.assertEqual(ids, ordered_ids[17:22])
+        self.assertIn('OFFSET 2', queries[-1])
+
+        # shallow pages do not use bookmarks
+        ids, queries = self.paginate({'offset': 0})
+        self.assertEqual(ids, ordered_ids[0:5])
+        self.assertEqual(len(queries), 1)
+
+    def test_bookmarks_are_separate_for_filters(self):
+        self.paginate({'offset': 10})
+        self.queryset = self.queryset.filter(value__gt=0)
+        ids, queries = self.paginate({'offset': 17})
+        self.assertEqual(ids, self.get_ordered_ids()[17:22])
+        self.assertIn('OFFSET 17', queries[-1])
+
+    def test_stale_bookmark(self):
+        self.paginate({'offset': 10})
+        ordered_ids = self.get_ordered_ids()
+        SampleModelForPagination.objects.filter(pk=ordered_ids[14]).delete()
+
+        ordered_ids = self.get_ordered_ids()
+        ids, queries = self.paginate({'offset': 17})
+        self.assertEqual(ids, ordered_ids[17:22])
+        self.assertIn('OFFSET 17', queries[-1])
+
+        SampleModelForPagination.objects.filter(pk=ordered_ids[21]).update(value=100)
+        ordered_ids = self.get_ordered_ids()
+        ids, queries = self.paginate({'offset': 23})
+        self.assertEqual(ids, ordered_ids[23:28])
+        self.assertIn('OFFSET 23', queries[-1])
+
+    def test_bookmarks_dropped_after_writes(self):
+        self.paginate({'offset': 10})
+        # a new row before the bookmark shifts the positions, the bookmarked row itself is unchanged
+        SampleModelForPagination.objects.create(value=0, name="new")
+        ordered_ids = self.get_ordered_ids()
+        ids, queries = self.paginate({'offset': 17})
+        self.assertEqual(ids, ordered_ids[17:22])
+        self.assertIn('OFFSET 17', queries[-1])
+
+        # bookmarks made after the write are used again
+        ids, queries = self.paginate({'offset': 23})
+        self.assertEqual(ids, ordered_ids[23:28])
+        self.assertIn('OFFSET 1', queries[-1])
+
+    def test_bookmarks_limit(self):
+        self.pagination.bookmarks_max_count = 2
+        for offset in (5, 10, 15):
+            self.paginate({'offset': offset})
+        bookmarks = cache.get(self.pagination.get_bookmarks_key(self.queryset.order_by("value", "pk")))
+        self.assertEqual(sorted(bookmarks.keys()), [15, 20])
+
+
+class TestDeepPaginationGuardrail(TestCase):
+    """ Tests for max_offset & max_page_number of the NoCounts paginators. """
+
+    def setUp(self):
+        class ExampleLimitOffsetPagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            max_offset = 10
+            cursor_query_param = 'cursor'
+
+        class ExamplePageNumberPagination(NoCountsPageNumberPagination):
+            page_size = 5
+            max_page_number = 2
+            cursor_query_param = 'cursor'
+
+        self.limit_offset_pagination = ExampleLimitOffsetPagination()
+        self.page_number_pagination = ExamplePageNumberPagination()
+        for i in range(30):
+            SampleModelForPagination.objects.create(value=i % 7, name=str(i))
+        self.queryset = SampleModelForPagination.objects.order_by("value")
+        self.ordered_ids = list(self.queryset.order_by("value", "pk").values_list("pk", flat=True))
+        cache.clear()
+
+    def paginate(self, pagination, url, queryset=None):
+        queryset = self.queryset if queryset is None else queryset
+        with CaptureQueriesContext(connection) as queries:
+            results = pagination.paginate_queryset(queryset, Request(factory.get(url)))
+        content = pagination.get_paginated_response([item.pk for item in results]).data
+        return content, [query['sql'] for query in queries]
+
+    def test_pages_within_limit(self):
+        content, _ = self.paginate(self.limit_offset_pagination, '/?offset=10')
+        self.assertEqual(content['results'], self.ordered_ids[10:15])
+        content, _ = self.paginate(self.page_number_pagination, '/?page=2')
+        self.assertEqual(content['results'], self.ordered_ids[5:10])
+
+    def test_reject_deep_offset(self):
+        with self.assertRaises(DeepPaginationError) as error:
+            self.paginate(self.limit_offset_pagination, '/?offset=20')
+        next_link = error.exception.detail['next']
+        self.assertIn('offset=10', next_link)
+        self.assertIn('cursor=', next_link)
+
+        # following links from the error
+        visited = []
+        while next_link:
+            content, queries = self.paginate(self.limit_offset_pagination, next_link)
+            for sql in queries:
+                self.assertNotIn('OFFSET', sql)
+            visited += content['results']
+            next_link = content['next']
+        self.assertEqual(visited, self.ordered_ids[10:])
+
+    def test_reject_deep_page(self):
+        with self.assertRaises(DeepPaginationError) as error:
+            self.paginate(self.page_number_pagination, '/?page=4')
+        self.assertIn('page=2', error.exception.detail['next'])
+        content, _ = self.paginate(self.page_number_pagination, error.exception.detail['next'])
+        self.assertEqual(content['results'], self.ordered_ids[5:10])
+        content, _ = self.paginate(self.page_number_pagination, content['next'])
+        self.assertEqual(content['results'], self.ordered_ids[10:15])
+
+    def test_reject_without_cursors(self):
+        self.limit_offset_pagination.cursor_query_param = None
+        with self.assertRaises(DeepPaginationError) as error:
+            self.paginate(self.limit_offset_pagination, '/?offset=20')
+        self.assertEqual(error.exception.detail, DeepPaginationError.default_detail)
+
+        # ordering that cannot be used for seeking
+        with self.assertRaises(DeepPaginationError):
+            self.paginate(self.limit_offset_pagination, '/?offset=20', self.queryset.order_by('?'))
+
+    def test_deep_offset_beyond_data(self):
+        content, _ = self.paginate(self.limit_offset_pagination, '/?offset=20',
+                                   self.queryset.filter(value__lt=1))
+        self.assertEqual(content['results'], [])
+        self.assertIsNone(content['next'])
+
+    def test_keyset_policy(self):
+        self.limit_offset_pagination.deep_pagination_policy = 'keyset'
+        content, queries = self.paginate(self.limit_offset_pagination, '/?offset=17')
+        self.assertEqual(content['results'], self.ordered_ids[17:22])
+        self.assertIn('LIMIT 1 OFFSET 9', queries[0])
+        self.assertIn('OFFSET 7', queries[1])
+        self.assertIn('cursor=', content['next'])
+
+        # remaining offset cannot be larger than the limit
+        with self.assertRaises(DeepPaginationError):
+            self.paginate(self.limit_offset_pagination, '/?offset=21')
+
+    def test_keyset_policy_with_bookmarks(self):
+        self.limit_offset_pagination.deep_pagination_policy = 'keyset'
+        self.limit_offset_pagination.bookmarks_cache_alias = 'default'
+        self.limit_offset_pagination.bookmarks_min_offset = 10
+        self.paginate(self.limit_offset_pagination, '/?offset=17')
+        content, queries = self.paginate(self.limit_offset_pagination, '/?offset=25')
+        self.assertEqual(content['results'], self.ordered_ids[25:30])
+        self.assertIn('OFFSET 3', queries[-1])
+
+    def test_keyset_policy_requires_cursors(self):
+        self.limit_offset_pagination.deep_pagination_policy = 'keyset'
+        self.limit_offset_pagination.cursor_query_param = None
+        self.assertRaises(AssertionError, self.paginate, self.limit_offset_pagination, '/?offset=17')
+
+
+class TestCountStrategies(TestCase):
+    """ Tests for opt-in counts of the NoCounts paginators. """
+
+    def setUp(self):
+        for i in range(20):
+            SampleModelForPagination.objects.create(value=i)
+        self.queryset = SampleModelForPagination.objects.order_by("value")
+        cache.clear()
+
+    def get_content(self, count_strategy, queryset, params):
+        class ExamplePagination(NoCountsPageNumberPagination):
+            page_size = 5
+
+        pagination = ExamplePagination()
+        pagination.count_strategy = count_strategy
+        request = Request(factory.get('/', params))
+        return pagination.get_paginated_response(pagination.paginate_queryset(queryset, request)).data
+
+    def test_no_count_by_default(self):
+        content = self.get_content(None, self.queryset, {})
+        self.assertNotIn('count', content)
+        self.assertNotIn('count_is_estimate', content)
+
+    def test_exact_count(self):
+        content = self.get_content(ExactCount(), self.queryset, {'page': 2})
+        self.assertEqual(content['count'], 20)
+        self.assertFalse(content['count_is_estimate'])
+        self.assertEqual(list(content.keys()), ['count', 'count_is_estimate', 'next', 'previous', 'results'])
+
+        class ExamplePagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            count_strategy = ExactCount()
+
+        pagination = ExamplePagination()
+        results = pagination.paginate_queryset(range(1, 101), Request(factory.get('/')))
+        self.assertEqual(pagination.get_paginated_response(results).data['count'], 100)
+
+    def test_capped_count(self):
+        self.assertEqual(self.get_content(CappedCount(10), self.queryset, {})['count'], 10)
+        self.assertTrue(self.get_content(CappedCount(10), self.queryset, {})['count_is_estimate'])
+
+        content = self.get_content(CappedCount(20), self.queryset, {})
+        self.assertEqual(content['count'], 20)
+        self.assertFalse(content['count_is_estimate'])
+
+        content = self.get_content(CappedCount(10), range(1, 6), {})
+        self.assertEqual(content['count'], 5)
+        self.assertFalse(content['count_is_estimate'])
+
+    def test_planner_estimate_falls_back_on_sqlite(self):
+        content = self.get_content(PlannerEstimateCount(fallback=CappedCount(10)), self.queryset, {})
+        self.assertEqual(content['count'], 10)
+        self.assertTrue(content['count_is_estimate'])
+
+    def test_cached_count(self):
+        strategy = CachedCount(timeout=60)
+        content = self.get_content(strategy, self.queryset, {})
+        self.assertEqual(content['count'], 20)
+        self.assertFalse(content['count_is_estimate'])
+
+        SampleModelForPagination.objects.create(value=100)
+        with self.assertNumQueries(1):
+            content = self.get_content(strategy, self.queryset.order_by("-value"), {})
+        self.assertEqual(content['count'], 20)
+        self.assertTrue(content['count_is_estimate'])
+
+        # different filters are cached separately
+        content = self.get_content(strategy, self.queryset.filter(value__lt=10), {})
+        self.assertEqual(content['count'], 10)
+        self.assertFalse(content['count_is_estimate'])
+
+
+class TestAnchorWindowPagination(TestCase):
+    """ Unit tests for AnchorWindowPagination. """
+
+    def setUp(self):
+        class ExamplePagination(AnchorWindowPagination):
+            default_limit = 3
+            max_limit = 5
+
+        self.pagination = ExamplePagination()
+        # values are descending & duplicated, so the order differs from ids and the tie-breaker is needed
+        self.items = [SampleModelForPagination.objects.create(value=(20 - i) // 2) for i in range(20)]
+        self.queryset = SampleModelForPagination.objects.order_by("value")
+        self.ordered_ids = list(self.queryset.order_by("value", "pk").values_list("pk", flat=True))
+
+    def paginate_queryset(self, request, queryset=None):
+        queryset = self.queryset if queryset is None else queryset
+        return [item.pk for item in self.pagination.paginate_queryset(queryset, request)]
+
+    def get_paginated_content(self, ids):
+        return self.pagination.get_paginated_response(ids).data
+
+    def test_no_anchor(self):
+        request = Request(factory.get('/'))
+        ids = self.paginate_queryset(request)
+        content = self.get_paginated_content(ids)
+        self.assertEqual(ids, self.ordered_ids[:3])
+        self.assertEqual(content, {
+            'results': self.ordered_ids[:3],
+            'previous': None,
+            'next': 'http://testserver/?after=3&anchor=%d' % self.ordered_ids[2]
+        })
+
+    def test_window_around_anchor(self):
+        anchor = self.ordered_ids[10]
+        request = Request(factory.get('/', {'anchor': anchor, 'before': 2, 'after': 4}))
+        ids = self.paginate_queryset(request)
+        content = self.get_paginated_content(ids)
+        self.assertEqual(ids, self.ordered_ids[8:10] + self.ordered_ids[11:15])
+        self.assertEqual(content['next'], 'http://testserver/?after=4&anchor=%d' % self.ordered_ids[14])
+        self.assertEqual(content['previous'], 'http://testserver/?after=0&anchor=%d&before=2' % self.ordered_ids[8])
+
+    def test_including_anchor(self):
+        self.pagination.include_anchor = True
+        anchor = self.ordered_ids[10]
+        request = Request(factory.get('/', {'anchor': anchor, 'before': 1, 'after': 1}))
+        self.assertEqual(self.paginate_queryset(request), self.ordered_ids[9:12])
+
+    def test_following_links_visits_every_item(self):
+        request = Request(factory.get('/', {'after': 5}))
+        visited = self.paginate_queryset(request)
+        next_link = self.get_paginated_content(visited)['next']
+        while next_link:
+            ids = self.paginate_queryset(Request(factory.get(next_link)))
+            visited += ids
+            next_link = self.get_paginated_content(ids)['next']
+        self.assertEqual(visited, self.ordered_ids)
+
+    def test_following_previous_links_visits_every_item(self):
+        request = Request(factory.get('/', {'anchor': self.ordered_ids[-1], 'before': 4, 'after': 0}))
+        visited = self.paginate_queryset(request)
+        content = self.get_paginated_content(visited)
+        self.assertEqual(content['next'], 'http://testserver/?after=4&anchor=%d' % self.ordered_ids[-1])
+        previous_link = content['previous']
+        while previous_link:
+            ids = self.paginate_queryset(Request(factory.get(previous_link)))
+            visited = ids + visited
+            previous_link = self.get_paginated_content(ids)['previous']
+        self.assertEqual(visited, self.ordered_ids[:-1])
+
+    def test_descending_ordering(self):
+        queryset = SampleModelForPagination.objects.order_by("-value")
+        ordered_ids = list(queryset.order_by("-value", "pk").values_list("pk", flat=True))
+        request = Request(factory.get('/', {'anchor': ordered_ids[5], 'before': 2, 'after': 2}))
+        self.assertEqual(self.paginate_queryset(request, queryset), ordered_ids[3:5] + ordered_ids[6:8])
+
+    def test_reversed_ordering(self):
+        queryset = SampleModelForPagination.objects.order_by("value").reverse()
+        ordered_ids = list(queryset.values_list("pk", flat=True))
+        self.assertEqual(ordered_ids, list(reversed(self.ordered_ids)))
+        request = Request(factory.get('/', {'anchor': ordered_ids[5], 'before': 2, 'after': 2}))
+        self.assertEqual(self.paginate_queryset(request, queryset), ordered_ids[3:5] + ordered_ids[6:8])
+
+    def test_window_limited_by_max_limit(self):
+        request = Request(factory.get('/', {'anchor': self.ordered_ids[10], 'before': 100, 'after': 100}))
+        self.assertEqual(self.paginate_queryset(request), self.ordered_ids[5:10] + self.ordered_ids[11:16])
+
+    def test_nonexistent_anchor(self):
+        request = Request(factory.get('/', {'anchor': 999}))
+        self.assertRaises(NotFound, self.paginate_queryset, request)
+
+    def test_incorrect_params(self):
+        for params in ({'anchor': 'invalid'}, {'after': -1}, {'after': 'x'}, {'after': 0}):
+            request = Request(factory.get('/', params))
+            self.assertRaises(IncorrectAnchorError, self.paginate_queryset, request)
+
+    def test_unsupported_ordering(self):
+        request = Request(factory.get('/'))
+        queryset = SampleModelForPagination.objects.order_by("name", "?")
+        self.assertRaises(IncorrectAnchorError, self.paginate_queryset, request, queryset)
+
+
+class TestPaginationMetrics(TestCase):
+    """ Tests for pagination_metrics signal. """
+
+    def setUp(self):
+        self.metrics = []
+        pagination_metrics.connect(self.collect_metrics)
+        for i in range(12):
+            SampleModelForPagination.objects.create(value=i)
+        self.queryset = SampleModelForPagination.objects.order_by("value")
+
+    def tearDown(self):
+        pagination_metrics.disconnect(self.collect_metrics)
+
+    def collect_metrics(self, sender, **kwargs):
+        self.metrics.append(dict(kwargs, sender=sender))
+
+    def test_limit_offset_metrics(self):
+        class ExamplePagination(NoCountsLimitOffsetPagination):
+            default_limit = 5
+            cursor_query_param = 'cursor'
+
+        pagination = ExamplePagination()
+        request = Request(factory.get('/', {'offset': 5}))
+        view = object()
+        pagination.paginate_queryset(self.queryset, request, view)
+        self.assertEqual(len(self.metrics), 1)
+        metrics = self.metrics[0]
+        self.assertEqual(metrics['sender'], ExamplePagination)
+        self.assertIs(metrics['paginator'], pagination)
+        self.assertIs(metrics['request'], request)
+        self.assertIs(metrics['view'], view)
+        self.assertEqual((metrics['offset'], metrics['page_size'], metrics['rows'], metrics['has_next']),
+                         (5, 5, 5, True))
+        self.assertEqual(metrics['method'], 'offset')
+        self.assertGreater(metrics['duration'], 0)
+
+        next_link = pagination.get_paginated_response([]).data['next']
+        pagination.paginate_queryset(self.queryset, Request(factory.get(next_link)))
+        self.assertEqual((self.metrics[1]['offset'], self.metrics[1]['rows'], self.metrics[1]['has_next']),
+                         (10, 2, False))
+        self.assertEqual(self.metrics[1]['method'], 'cursor')
+
+    def test_page_number_metrics(self):
+        class ExamplePagination(NoCountsPageNumberPagination):
+            page_size = 5
+
+        ExamplePagination().paginate_queryset(self.queryset, Request(factory.get('/', {'page': 3})))
+        metrics = self.metrics[0]
+        self.assertEqual((metrics['offset'], metrics['page_size'], metrics['rows'], metrics['has_next']),
+                         (10, 5, 2, False))
+
+    def test_anchor_window_metrics(self):
+        AnchorWindowPagination().paginate_queryset(self.queryset, Request(factory.get('/', {'after': 4})))
+        metrics = self.metrics[0]
+        self.assertEqual((metrics['offset'], metrics['page_size'], metrics['rows'], metrics['has_next']),
+                         (None, 4, 4, True))
+        self.assertEqual(metrics['method'], 'anchor')
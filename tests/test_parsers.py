@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+import pytest
+from rest_framework.exceptions import ParseError
+
+from drf_tweaks.parsers import JSONArrayStream, StreamingJSONArrayParser
+
+
+@pytest.mark.parametrize("read_size", [1, 3, 1024])
+def test_json_array_stream(read_size):
+    data = [{"id": 1, "value": 12345}, {"temp_id": 2, "text": "zażółć \"[,]\""}, 123456, None, [1, [2]], True]
+    stream = JSONArrayStream(io.BytesIO(f" {json.dumps(data)}\n".encode("utf-8")), read_size=read_size)
+    assert list(stream) == data
+
+
+def test_json_array_stream_empty():
+    assert list(JSONArrayStream(io.BytesIO(b" [ ] "))) == []
+
+
+def test_json_array_stream_is_lazy():
+    items = iter(JSONArrayStream(io.BytesIO(b'[{"id": 1}, {"id": 2}, incorrect'), read_size=4))
+    assert next(items) == {"id": 1}
+    assert next(items) == {"id": 2}
+    with pytest.raises(ParseError):
+        next(items)
+
+
+@pytest.mark.parametrize("content", [b"[1, 2", b"[1 2]", b"[1, 2] 3", b"[1,]"])
+def test_json_array_stream_errors(content):
+    with pytest.raises(ParseError):
+        list(JSONArrayStream(io.BytesIO(content), read_size=2))
+
+
+def test_parser():
+    parser = StreamingJSONArrayParser()
+    assert isinstance(parser.parse(io.BytesIO(b' [{"id": 1}]')), JSONArrayStream)
+    assert parser.parse(io.BytesIO(b' {"id": 1}')) == {"id": 1}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b'{"id": '))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.test import TestCase
+
+from drf_tweaks.query_plans import get_autofilter_views, get_plan_problems, run_checks
+from tests.test_autofilter import (
+    SampleApiV1, SampleApiWithCompactIn, SampleApiWithIndexes, SampleApiWithRelatedCompactIn,
+    SampleApiWithRelatedIndexes
+)
+
+
+@override_settings(ROOT_URLCONF="tests.test_autofilter")
+class TestQueryPlans(TestCase):
+    def get_results(self, view_class):
+        return {check.description: check.problems for check in run_checks(view_class)}
+
+    def test_autofilter_views(self):
+        self.assertEqual(get_autofilter_views(), [
+            SampleApiV1, SampleApiWithIndexes, SampleApiWithRelatedIndexes, SampleApiWithCompactIn,
+            SampleApiWithRelatedCompactIn
+        ])
+
+    def test_checks(self):
+        results = self.get_results(SampleApiV1)
+        self.assertEqual(results["?indexed_int"], [])
+        self.assertEqual(results["?indexed_int__gt"], [])
+        self.assertEqual(results["?indexed_int__in"], [])
+        self.assertEqual(results["?nullable_field__isnull"], [])
+        self.assertEqual(results["?fk"], [])
+        self.assertEqual(results["?indexed_char__icontains"], ["full scan"])
+        self.assertEqual(results["?ordering=indexed_int"], [])
+        self.assertEqual(results["?ordering=-indexed_int"], [])
+
+    def test_composite_index_orderings(self):
+        results = self.get_results(SampleApiWithIndexes)
+        self.assertEqual(results["?ordering=c,-a"], [])
+        self.assertEqual(results["?ordering=-c,a"], [])
+        self.assertEqual(results["?ordering=a,b"], [])
+
+    def test_related_filters(self):
+        results = self.get_results(SampleApiWithRelatedIndexes)
+        self.assertEqual(results["?related__name"], [])
+        self.assertEqual(results["?related__name__in"], [])
+        self.assertEqual(results["?related__parent__c"], [])
+        self.assertEqual(results["?ordering=related__name"], [])
+
+    def test_plan_problems(self):
+        self.assertEqual(get_plan_problems("3 0 0 SEARCH t USING INDEX i (a=?)", "sqlite"), [])
+        self.assertEqual(get_plan_problems("2 0 0 SCAN t", "sqlite"), ["full scan"])
+        self.assertEqual(
+            get_plan_problems("23 0 0 USE TEMP B-TREE FOR ORDER BY", "sqlite", ordering=True), ["filesort"]
+        )
+        self.assertEqual(get_plan_problems("Seq Scan on t  (cost=0.00..1.01 rows=1)", "postgresql"), ["full scan"])
+        self.assertEqual(get_plan_problems(
+            "Sort  (cost=1.02..1.03 rows=1 width=4)\n  ->  Index Scan using i on t", "postgresql", ordering=True
+        ), ["filesort"])
+        self.assertEqual(get_plan_problems(
+            "Index Scan using i on t  (cost=0.00..1.01 rows=1 width=4)", "postgresql", ordering=True
+        ), [])
+        self.assertEqual(get_plan_problems("1 SIMPLE t ALL 10 Using where", "mysql"), ["full scan"])
+        self.assertEqual(get_plan_problems("anything", "oracle"), [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command("check_autofilter_plans", urlconf="tests.test_autofilter", stdout=out)
+        self.assertIn("tests.test_autofilter.SampleApiV1 ?indexed_int: OK", out.getvalue())
+        self.assertIn("tests.test_autofilter.SampleApiV1 ?indexed_char__icontains: FULL SCAN", out.getvalue())
+
+        with self.assertRaises(CommandError):
+            call_command("check_autofilter_plans", urlconf="tests.test_autofilter", fail_on_problems=True,
+                         stdout=StringIO())
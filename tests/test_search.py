@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection, models
+from django.test import override_settings
+from django.test import TestCase
+from django.urls import re_path
+from django.urls import reverse
+from rest_framework.generics import ListAPIView
+from rest_framework.permissions import AllowAny
+
+from drf_tweaks import serializers
+from drf_tweaks.autofilter import autofilter
+from drf_tweaks.search import (
+    _create_search_indexes, FullTextSearchFilter, get_search_tokens, register_search_index, SearchIndex
+)
+from tests.models import SampleModel, SampleSearchModel
+
+
+class SampleSearchModelSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SampleSearchModel
+        fields = ["id", "title", "body", "position"]
+
+
+@autofilter(search=("title", "body"))
+class SampleSearchApi(ListAPIView):
+    permission_classes = (AllowAny,)
+    serializer_class = SampleSearchModelSerializer
+    queryset = SampleSearchModel.objects.all()
+
+
+urlpatterns = [
+    re_path(r"^search/$", SampleSearchApi.as_view(), name="search_test"),
+]
+
+
+@override_settings(ROOT_URLCONF="tests.test_search")
+class TestFullTextSearch(TestCase):
+    def setUp(self):
+        self.first = SampleSearchModel.objects.create(title="Hello world", body="lorem ipsum", position=1)
+        self.second = SampleSearchModel.objects.create(title="World", body="hello hello", position=2)
+        self.third = SampleSearchModel.objects.create(title="Other", body="dolor", position=3)
+
+    def search(self, **data):
+        response = self.client.get(reverse("search_test"), data=data)
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.data]
+
+    def test_backend(self):
+        self.assertIn(FullTextSearchFilter, SampleSearchApi.filter_backends)
+
+    def test_search(self):
+        self.assertEqual(set(self.search(search="hello")), {self.first.id, self.second.id})
+        self.assertEqual(self.search(search="world lor"), [self.first.id])
+        # the last word is a prefix
+        self.assertEqual(self.search(search="dol"), [self.third.id])
+        self.assertEqual(len(self.search(search="")), 3)
+        # full text search syntax is ignored
+        self.assertEqual(len(self.search(search='" * (')), 3)
+        self.assertEqual(self.search(search='"other" OR'), [])
+
+    def test_ranking(self):
+        self.assertEqual(self.search(search="hello"), [self.second.id, self.first.id])
+        self.assertEqual(self.search(search="hello", ordering="id"), [self.first.id, self.second.id])
+
+    def test_sync(self):
+        self.third.body = "hello"
+        self.third.save()
+        self.assertIn(self.third.id, self.search(search="hello"))
+        self.assertEqual(self.search(search="dolor"), [])
+
+        self.first.delete()
+        self.assertEqual(set(self.search(search="hello")), {self.second.id, self.third.id})
+
+    def test_fallback(self):
+        with mock.patch.object(SearchIndex, "is_supported", return_value=False):
+            self.assertEqual(set(self.search(search="hello")), {self.first.id, self.second.id})
+            self.assertEqual(self.search(search="world lor"), [self.first.id])
+
+    def test_rebuild_command(self):
+        # bulk_create does not send signals
+        SampleSearchModel.objects.bulk_create([SampleSearchModel(title="bulk", body="")])
+        self.assertEqual(self.search(search="bulk"), [])
+
+        out = StringIO()
+        call_command("rebuild_search_index", "tests.SampleSearchModel", urlconf="tests.test_search", stdout=out)
+        self.assertIn("tests.samplesearchmodel: rebuilt", out.getvalue())
+        self.assertEqual(len(self.search(search="bulk")), 1)
+        self.assertEqual(set(self.search(search="hello")), {self.first.id, self.second.id})
+
+    def test_configuration_errors(self):
+        with self.assertRaises(ImproperlyConfigured):
+            register_search_index(SampleSearchModel, ("title", ))
+        with self.assertRaises(ImproperlyConfigured):
+            register_search_index(SampleModel, ("id", ))
+        with mock.patch.object(SampleSearchModel._meta, "pk", models.CharField(max_length=10)):
+            with self.assertRaises(ImproperlyConfigured):
+                SearchIndex(SampleSearchModel, ("title", ))
+
+    def test_table_created_after_migrate(self):
+        self.assertIn(SampleSearchApi.search_index.table, connection.introspection.table_names())
+
+        with mock.patch.object(connection.introspection, "table_names", return_value=[]), \
+                mock.patch.object(SampleSearchApi.search_index, "rebuild") as rebuild:
+            _create_search_indexes(sender=None, app_config=apps.get_app_config("auth"), using="default")
+            rebuild.assert_not_called()
+            _create_search_indexes(sender=None, app_config=apps.get_app_config("tests"), using="default")
+            rebuild.assert_called_once_with("default")
+
+    def test_missing_table_does_not_break_saving(self):
+        with mock.patch.object(SampleSearchApi.search_index, "table", "tests_missing_search"), \
+                self.assertLogs("drf_tweaks.search", level="ERROR"):
+            obj = SampleSearchModel.objects.create(title="missing", body="")
+            obj.delete()
+        self.assertEqual(SampleSearchModel.objects.count(), 3)
+
+    def test_tokens(self):
+        self.assertEqual(get_search_tokens('"foo" AND bar*'), ["foo", "AND", "bar"])